@@ -0,0 +1,57 @@
+"""チャンク分割（TextExtractor._split_text_to_chunks）のベンチマーク
+
+実行方法（backend ディレクトリで）:
+    pip install pytest-benchmark
+    python -m pytest benchmarks/bench_chunker.py --benchmark-columns=mean,ops
+
+各ケースのスループット（MB/s）は extra_info に記録される（--benchmark-json で出力可能）。
+"""
+import glob
+import os
+import sys
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from services.extractor_service import TextExtractor  # noqa: E402
+
+TESTDATA_DIR = os.path.join(os.path.dirname(BACKEND_DIR), "testdata")
+
+
+def _testdata_inputs():
+    inputs = {}
+    for path in sorted(glob.glob(os.path.join(TESTDATA_DIR, "*.txt"))):
+        with open(path, encoding="utf-8") as f:
+            inputs[os.path.basename(path)] = f.read()
+    return inputs
+
+
+def _synthetic_inputs():
+    """大きな入力（文書・CSV・短い文の連続・改行なしの1行）"""
+    paragraph = "■見出し\n本文の説明が続きます。詳細は次の通りです！ Details follow here. 確認してください？\n\n"
+    return {
+        "synthetic_document_4mb": paragraph * (4 * 1024 * 1024 // len(paragraph.encode("utf-8"))),
+        "synthetic_csv_200k_rows": "\n".join(f"{i},名前{i},部署{i % 7},{i * 3.5}" for i in range(200000)),
+        "synthetic_short_sentences": "はい。" * 300000,
+        "synthetic_single_line": ",".join(str(i) for i in range(500000)),
+    }
+
+
+INPUTS = {**_testdata_inputs(), **_synthetic_inputs()}
+
+
+@pytest.mark.parametrize("name", list(INPUTS))
+def test_split_text_to_chunks(benchmark, name):
+    text = INPUTS[name]
+    size_mb = len(text.encode("utf-8")) / (1024 * 1024)
+
+    chunks = benchmark(TextExtractor._split_text_to_chunks, text)
+
+    assert chunks
+    benchmark.extra_info["input_mb"] = round(size_mb, 3)
+    benchmark.extra_info["chunks"] = len(chunks)
+    benchmark.extra_info["mb_per_sec"] = round(size_mb / benchmark.stats.stats.mean, 1)
@@ -0,0 +1,271 @@
+"""テキスト抽出・チャンク分割（TextExtractor.extract_chunks）のベンチマーク
+
+testdata のファイル（PDF・PowerPoint・テキスト）と、生成した大きな Word / Excel / PDF を対象に、
+形式ごとの処理時間・スループット（文字/秒）・チャンク数・平均チャンクサイズ・ピークメモリ（RSS）を計測する。
+各ケースは別プロセスで実行する（ピークRSSをケースごとに測るため）。ピークRSSは計測プロセス自身（peak_rss_mb）と、
+PDFの並列抽出で起動した子プロセスのうち最大のもの（peak_rss_children_mb）を分けて記録する。
+
+実行方法（backend ディレクトリで）:
+    python benchmarks/bench_extraction.py --output bench_results.json
+    python benchmarks/bench_extraction.py --output new.json --compare bench_results.json --threshold 0.2
+
+--compare を指定すると前回の結果と比べ、処理時間が threshold（割合）を超えて遅くなったケースがあれば
+終了コード 1 を返す。比較は同じマシンで取った結果同士で行うこと。
+"""
+import argparse
+import glob
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+TESTDATA_DIR = os.path.join(os.path.dirname(BACKEND_DIR), "testdata")
+
+PARAGRAPH = "本システムは社内文書の検索を目的とする。要件定義に従い、各機能の仕様を以下に記す。"
+
+
+def _peak_rss_mb(who=None):
+    """ピークRSS（MB）。who が RUSAGE_CHILDREN の場合は終了した子プロセスのうち最大のもの"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF if who is None else who).ru_maxrss
+    # macOS はバイト、Linux はKB
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _load_extractor():
+    """TextExtractor を読み込む
+
+    services パッケージの __init__ は Azure SDK・OpenAI・NumPy などを読み込みRSSの基準値が大きくなるため、
+    extractor_service をトップレベルのモジュールとして直接読み込む（並列抽出の子プロセスも同じ名前で読み込める）。
+    """
+    services_dir = os.path.join(BACKEND_DIR, "services")
+    if services_dir not in sys.path:
+        sys.path.insert(0, services_dir)
+    from extractor_service import TextExtractor
+    return TextExtractor
+
+
+def _generate_docx(path, scale):
+    from docx import Document
+
+    doc = Document()
+    for i in range(3000 * scale):
+        if i % 50 == 0:
+            doc.add_heading(f"第{i // 50 + 1}章 機能仕様", level=1)
+        doc.add_paragraph(f"{i + 1}. {PARAGRAPH}")
+    for t in range(10 * scale):
+        table = doc.add_table(rows=20, cols=4)
+        for r, row in enumerate(table.rows):
+            for c, cell in enumerate(row.cells):
+                cell.text = f"表{t + 1} 行{r + 1} 列{c + 1}"
+    doc.save(path)
+
+
+def _generate_xlsx(path, scale):
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    for s in range(2):
+        sheet = wb.create_sheet(f"売上{s + 1}")
+        sheet.append(["日付", "担当者", "部署", "商品", "数量", "金額"])
+        for i in range(25000 * scale):
+            sheet.append([f"2024-{i % 12 + 1:02d}-{i % 28 + 1:02d}", f"社員{i % 300}", f"部署{i % 7}",
+                          f"商品{i % 50}", i % 100, i * 1.5])
+    wb.save(path)
+
+
+def _generate_pdf(path, scale):
+    import fitz  # PyMuPDF
+
+    doc = fitz.open()
+    for i in range(200 * scale):
+        page = doc.new_page()
+        text = f"{i + 1}ページ\n" + "\n".join(f"{j + 1}. {PARAGRAPH}" for j in range(25))
+        page.insert_textbox(fitz.Rect(40, 40, 560, 800), text, fontname="japan", fontsize=9)
+    doc.save(path)
+    doc.close()
+
+
+GENERATORS = {
+    "generated_large.docx": _generate_docx,
+    "generated_large.xlsx": _generate_xlsx,
+    "generated_large.pdf": _generate_pdf,
+}
+
+
+def _collect_inputs(fixtures_dir, scale):
+    """計測対象のファイル（testdata と生成した大きなファイル）"""
+    inputs = [
+        path for path in sorted(glob.glob(os.path.join(TESTDATA_DIR, "*")))
+        if os.path.splitext(path)[1].lower() in (".pdf", ".pptx", ".docx", ".xlsx", ".txt")
+    ]
+
+    for name, generate in GENERATORS.items():
+        path = os.path.join(fixtures_dir, f"x{scale}_{name}")
+        if not os.path.exists(path):
+            print(f"[Generate] {os.path.basename(path)}...")
+            generate(path, scale)
+        inputs.append(path)
+    return inputs
+
+
+def run_case(path, repeat):
+    """1ファイル分の計測（子プロセスで実行）"""
+    TextExtractor = _load_extractor()
+
+    with open(path, "rb") as f:
+        content = f.read()
+    file_name = os.path.basename(path)
+
+    # 1回目はライブラリの読み込みを含むため計測しない
+    TextExtractor.extract_chunks(content, file_name)
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        chunks, file_type = TextExtractor.extract_chunks(content, file_name)
+        times.append(time.perf_counter() - started)
+
+    best = min(times)
+    chars = sum(len(chunk.text) for chunk in chunks)
+    return {
+        "name": file_name,
+        "format": file_type,
+        "input_bytes": len(content),
+        "wall_ms": round(best * 1000, 1),
+        "wall_ms_median": round(sorted(times)[len(times) // 2] * 1000, 1),
+        "chars": chars,
+        "chars_per_sec": round(chars / best) if best else None,
+        "chunks": len(chunks),
+        "avg_chunk_chars": round(chars / len(chunks), 1) if chunks else 0,
+        "peak_rss_mb": _peak_rss_mb(),
+        "peak_rss_children_mb": _peak_rss_mb(resource.RUSAGE_CHILDREN) if resource else None,
+    }
+
+
+def _run_in_subprocess(path, repeat):
+    result = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--run-case", path, "--repeat", str(repeat)],
+        capture_output=True, text=True, cwd=BACKEND_DIR
+    )
+    if result.returncode != 0:
+        raise Exception(f"Benchmark failed for {path}: {result.stderr.strip()}")
+    # 最終行が計測結果（抽出中の print は無視する）
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def _summarize_formats(cases):
+    """形式ごとの合計"""
+    formats = {}
+    for case in cases:
+        summary = formats.setdefault(case["format"], {"files": 0, "wall_ms": 0.0, "chars": 0, "chunks": 0,
+                                                      "peak_rss_mb": None, "peak_rss_children_mb": None})
+        summary["files"] += 1
+        summary["wall_ms"] = round(summary["wall_ms"] + case["wall_ms"], 1)
+        summary["chars"] += case["chars"]
+        summary["chunks"] += case["chunks"]
+        for key in ("peak_rss_mb", "peak_rss_children_mb"):
+            if case.get(key) is not None:
+                summary[key] = max(summary[key] or 0, case[key])
+
+    for summary in formats.values():
+        summary["chars_per_sec"] = round(summary["chars"] / (summary["wall_ms"] / 1000)) if summary["wall_ms"] else None
+        summary["avg_chunk_chars"] = round(summary["chars"] / summary["chunks"], 1) if summary["chunks"] else 0
+    return formats
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, cwd=BACKEND_DIR
+        ).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare(results, baseline, threshold, min_delta_ms):
+    """前回の結果と比較し、遅くなったケースを返す（差が min_delta_ms 未満のケースは誤差とみなす）"""
+    baseline_cases = {case["name"]: case for case in baseline["cases"]}
+    regressions = []
+    for case in results["cases"]:
+        before = baseline_cases.get(case["name"])
+        if not before:
+            continue
+
+        ratio = case["wall_ms"] / before["wall_ms"] if before["wall_ms"] else 1.0
+        regressed = ratio > 1 + threshold and case["wall_ms"] - before["wall_ms"] >= min_delta_ms
+        status = "[REGRESSION]" if regressed else "[OK]"
+        print(f"{status} {case['name']}: {before['wall_ms']} ms -> {case['wall_ms']} ms ({ratio:.2f}x)")
+        if case["chunks"] != before["chunks"]:
+            print(f"  [WARN] chunk count changed: {before['chunks']} -> {case['chunks']}")
+        if regressed:
+            regressions.append(case["name"])
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TextExtractor.extract_chunks のベンチマーク")
+    parser.add_argument("--output", default="bench_results.json", help="結果のJSONファイル")
+    parser.add_argument("--compare", help="比較対象（前回の結果のJSONファイル）")
+    parser.add_argument("--threshold", type=float, default=0.2, help="遅くなったとみなす割合（0.2 = 20%%）")
+    parser.add_argument("--min-delta-ms", type=float, default=5.0, help="これより小さい差は遅くなったとみなさない")
+    parser.add_argument("--repeat", type=int, default=3, help="ケースごとの繰り返し回数（最短時間を採用）")
+    parser.add_argument("--scale", type=int, default=1, help="生成するファイルの大きさの倍率")
+    parser.add_argument("--fixtures-dir", default=os.path.join(tempfile.gettempdir(), "extraction_bench_fixtures"),
+                        help="生成したファイルの保存先（再利用する）")
+    parser.add_argument("--run-case", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_case:
+        print(json.dumps(run_case(args.run_case, args.repeat), ensure_ascii=False))
+        return
+
+    os.makedirs(args.fixtures_dir, exist_ok=True)
+    cases = []
+    for path in _collect_inputs(args.fixtures_dir, args.scale):
+        case = _run_in_subprocess(path, args.repeat)
+        cases.append(case)
+        print(f"[{case['format']}] {case['name']}: {case['wall_ms']} ms, {case['chars_per_sec']} chars/s, "
+              f"{case['chunks']} chunks (avg {case['avg_chunk_chars']} chars), peak RSS {case['peak_rss_mb']} MB "
+              f"(child processes {case['peak_rss_children_mb']} MB)")
+
+    TextExtractor = _load_extractor()
+
+    results = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "extractor_settings": TextExtractor.cache_settings(),
+        "repeat": args.repeat,
+        "scale": args.scale,
+        "cases": cases,
+        "formats": _summarize_formats(cases),
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"[OK] Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold, args.min_delta_ms)
+        if regressions:
+            print(f"[ERROR] {len(regressions)} case(s) slower than baseline by more than {args.threshold:.0%}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
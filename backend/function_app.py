@@ -1,22 +1,38 @@
 import azure.functions as func
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi import FastAPI, UploadFile, File, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Callable, Iterator, List, Optional, Tuple
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
-import uuid
+import asyncio
+import hashlib
 import os
+import tempfile
+import time
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 
 # Load environment variables
 load_dotenv()
 
-from services import BlobService, OpenAIService, SearchService, TextExtractor, EmployeeService
+from services import BlobService, OpenAIService, SearchService, LocalSearchService, TextExtractor, EmployeeService, IngestService, JobService, SQLiteJobStore, BlobJobStore, IndexManifest, ExtractionCache, process_pool_context
+from services.resilience import CircuitOpenError, DeadlineExceededError, deadline_scope, breaker_status
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """起動時に取り込みジョブのワーカーを起動（前回のプロセスで待機中・実行中だったジョブを再開する）"""
+    job_service.start_workers(_process_ingest_job)
+    yield
+
 
 # Initialize FastAPI app
 fastapi_app = FastAPI(
     title="Document Analysis API",
     description="API for document upload, search, and AI-powered analysis",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS configuration
@@ -28,11 +44,42 @@ fastapi_app.add_middleware(
     allow_headers=["*"],
 )
 
+# 対話的なリクエストの期限（秒）。期限は下流の Azure 呼び出し（再試行・待機を含む）に伝搬する
+REQUEST_DEADLINE_SECONDS = float(os.getenv("REQUEST_DEADLINE_SECONDS", "30"))
+DEADLINE_PATH_PREFIXES = ("/api/search", "/api/ai/", "/api/employees")
+
+
+@fastapi_app.middleware("http")
+async def request_deadline(request: Request, call_next):
+    """検索・AI・社員APIにリクエスト単位の期限を設定（取り込み・再インデックスは対象外）"""
+    if not request.url.path.startswith(DEADLINE_PATH_PREFIXES):
+        return await call_next(request)
+    with deadline_scope(REQUEST_DEADLINE_SECONDS):
+        return await call_next(request)
+
+
+def _error_status(e: Exception) -> int:
+    """例外に対応する HTTP ステータス（依存サービス停止: 503、期限切れ: 504）"""
+    if isinstance(e, CircuitOpenError):
+        return 503
+    if isinstance(e, DeadlineExceededError):
+        return 504
+    return 500
+
 # Initialize services
 blob_service = BlobService()
 openai_service = OpenAIService()
-search_service = SearchService()
+# SEARCH_BACKEND=local の場合は Azure AI Search の代わりにプロセス内のインデックスを使う（ローカル開発・CI・負荷試験用）
+search_service = LocalSearchService() if os.getenv("SEARCH_BACKEND", "azure").lower() == "local" else SearchService()
 employee_service = EmployeeService()
+index_manifest = IndexManifest()
+if not search_service.PERSISTENT:
+    # インデックスはメモリ上にしかないため、前回のプロセスのマニフェストを消して再インデックスで全件登録し直す
+    index_manifest.clear()
+ingest_service = IngestService(openai_service, search_service, index_manifest)
+# INGEST_JOB_BACKEND=blob の場合はジョブを Blob Storage に保存する（スケールアウトした全インスタンスで共有）
+job_service = JobService(BlobJobStore() if os.getenv("INGEST_JOB_BACKEND", "sqlite").lower() == "blob" else SQLiteJobStore())
+extraction_cache = ExtractionCache() if os.getenv("EXTRACTION_CACHE_ENABLED", "true").lower() == "true" else None
 
 # Register tool handlers for OpenAI Function Calling
 openai_service.register_tool_handler("register_employee", employee_service.register_employee)
@@ -75,6 +122,100 @@ class AdminAuthRequest(BaseModel):
 # Simple admin password (in production, use environment variable)
 ADMIN_PASSWORD = os.getenv("ADMIN_PASSWORD", "admin123")
 
+# 再インデックスの並列数（ダウンロード: スレッド、抽出: プロセス、同時に処理するファイル数）
+REINDEX_DOWNLOAD_WORKERS = int(os.getenv("REINDEX_DOWNLOAD_WORKERS", "4"))
+REINDEX_EXTRACT_WORKERS = int(os.getenv("REINDEX_EXTRACT_WORKERS", str(os.cpu_count() or 2)))
+REINDEX_MAX_FILES_IN_FLIGHT = int(os.getenv("REINDEX_MAX_FILES_IN_FLIGHT", "4"))
+
+# バックグラウンド取り込みで進捗を記録する単位（チャンク数）
+INGEST_JOB_CHUNK_BATCH = int(os.getenv("INGEST_JOB_CHUNK_BATCH", "32"))
+
+
+# ストリーミングアップロードで一時ファイルに書き出す単位（バイト）
+UPLOAD_SPOOL_BLOCK_SIZE = int(os.getenv("UPLOAD_SPOOL_BLOCK_SIZE", str(1024 * 1024)))
+
+
+async def _spool_upload(file: UploadFile) -> Tuple[str, str]:
+    """アップロードをブロック単位で一時ファイルに書き出す（メモリ使用量はブロックサイズで頭打ち）
+
+    Returns: (一時ファイルのパス, sha256)
+    """
+    sha256 = hashlib.sha256()
+    fd, temp_path = tempfile.mkstemp(suffix=os.path.splitext(file.filename or "")[1])
+    with os.fdopen(fd, "wb") as f:
+        while True:
+            block = await file.read(UPLOAD_SPOOL_BLOCK_SIZE)
+            if not block:
+                break
+            sha256.update(block)
+            f.write(block)
+    return temp_path, sha256.hexdigest()
+
+
+def _file_sha256(file_path: str) -> str:
+    """ファイルをブロック単位で読みながら sha256 を計算"""
+    sha256 = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(UPLOAD_SPOOL_BLOCK_SIZE), b""):
+            sha256.update(block)
+    return sha256.hexdigest()
+
+
+def _index_chunk_stream(file_name: str, chunks: Iterator,
+                        on_batch: Optional[Callable[[int, list, List[dict]], None]] = None,
+                        before_batch: Optional[Callable[[int, list], None]] = None) -> List[dict]:
+    """抽出中のチャンクを INGEST_JOB_CHUNK_BATCH 件ずつエンリッチ・インデックス登録
+
+    最初のページ・スライドが読めた時点で処理を始め、全チャンクをメモリに保持しない。
+    before_batch(開始位置, チャンク) はバッチのエンリッチ前、on_batch(開始位置, チャンク, 結果) は登録後に呼ばれる。
+    """
+    all_results = []
+    while True:
+        batch = list(islice(chunks, INGEST_JOB_CHUNK_BATCH))
+        if not batch:
+            break
+        if before_batch:
+            before_batch(len(all_results), batch)
+        chunk_results = ingest_service.index_chunks(file_name, batch)
+        if on_batch:
+            on_batch(len(all_results), batch, chunk_results)
+        all_results.extend(chunk_results)
+    return all_results
+
+
+def _process_ingest_job(job: dict):
+    """取り込みジョブの処理: Blobから一時ファイルに取得 → チャンク抽出しながらエンリッチ・インデックス登録"""
+    job_id = job["job_id"]
+    file_name = job["file_name"]
+
+    fd, temp_path = tempfile.mkstemp(suffix=os.path.splitext(file_name)[1])
+    os.close(fd)
+    try:
+        if not blob_service.download_to_file(file_name, temp_path):
+            raise Exception(f"Document not found in storage: {file_name}")
+
+        content_hash = _file_sha256(temp_path)
+        rejection = TextExtractor.check_supported(temp_path, file_name, job["content_type"] or "")
+        if rejection:
+            raise Exception(rejection)
+
+        chunks, file_type = TextExtractor.iter_chunks_from_file(temp_path, file_name, job["content_type"] or "")
+        job_service.set_chunks(job_id, file_type, [])
+
+        # エンリッチ前にチャンクを登録し（pending）、登録後に結果を記録する
+        def register_batch(start: int, batch: list):
+            job_service.add_chunks(job_id, start, [chunk.chunk_id for chunk in batch])
+
+        def record_batch(start: int, batch: list, chunk_results: List[dict]):
+            job_service.record_chunk_results(job_id, start, chunk_results)
+
+        all_results = _index_chunk_stream(file_name, chunks, on_batch=record_batch, before_batch=register_batch)
+    finally:
+        os.remove(temp_path)
+
+    print(f"[{file_type}] {file_name}: {len(all_results)} chunks extracted (job {job_id})")
+    ingest_service.record_file(file_name, all_results, content_hash)
+
 
 # Health check endpoint
 @fastapi_app.get("/api/health")
@@ -82,104 +223,160 @@ async def health_check():
     return {"status": "healthy"}
 
 
+@fastapi_app.get("/api/metrics")
+async def get_metrics():
+    """Cache hit/miss counters and other runtime metrics"""
+    return {
+        "enrichment_cache": openai_service.enrichment_cache.stats() if openai_service.enrichment_cache else None,
+        "query_embedding_cache": openai_service.query_embedding_cache.stats() if openai_service.query_embedding_cache else None,
+        "extraction_cache": extraction_cache.stats() if extraction_cache else None,
+        "openai_rate_limiter": openai_service.rate_limiter.metrics(),
+        "circuit_breakers": breaker_status(),
+        "search_index": search_service.stats()
+    }
+
+
 # Document endpoints
 @fastapi_app.post("/api/documents/upload")
-async def upload_document(file: UploadFile = File(...)):
-    """Upload a document to Azure Blob Storage and index it (chunk by chunk)"""
+async def upload_document(file: UploadFile = File(...), background: bool = False, streaming: bool = False):
+    """Upload a document to Azure Blob Storage and index it (chunk by chunk)
+
+    background=true の場合はBlobへの保存後に取り込みジョブを登録してすぐに返す
+    （進捗は GET /api/jobs/{job_id} で確認）
+    streaming=true の場合はファイル全体をメモリに載せず、一時ファイル経由でBlobへの
+    ブロック並列アップロードとテキスト抽出を行う
+    """
+    temp_path = None
     try:
-        content = await file.read()
         file_name = file.filename
+        content_type = file.content_type or "application/octet-stream"
+
+        # 対応していない形式・拡張子と中身が一致しないファイルは、読み込み・Blob保存・エンリッチの前に拒否
+        head = await file.read(TextExtractor.SNIFF_BYTES)
+        await file.seek(0)
+        rejection = TextExtractor.check_header(head, file_name, file.content_type or "")
+        if rejection:
+            raise HTTPException(status_code=415, detail=rejection)
+
+        if streaming:
+            temp_path, content_hash = await _spool_upload(file)
+        else:
+            content = await file.read()
+            content_hash = hashlib.sha256(content).hexdigest()
+
+        # OOXML（ZIP）の種類はファイル全体を取得してから確認
+        rejection = TextExtractor.check_supported(temp_path if streaming else content, file_name, file.content_type or "")
+        if rejection:
+            raise HTTPException(status_code=415, detail=rejection)
 
         # Upload to Blob Storage
-        blob_result = blob_service.upload_document(
-            file_name=file_name,
-            file_content=content,
-            content_type=file.content_type or "application/octet-stream"
-        )
+        if streaming:
+            blob_result = await run_in_threadpool(
+                blob_service.upload_document_from_file, file_name, temp_path, content_type
+            )
+        else:
+            blob_result = await run_in_threadpool(
+                blob_service.upload_document,
+                file_name=file_name,
+                file_content=content,
+                content_type=content_type
+            )
 
-        # Extract text content as chunks
-        chunks, file_type = TextExtractor.extract_chunks(
-            content,
-            file_name,
-            file.content_type or ""
-        )
-        print(f"[{file_type}] {file_name}: {len(chunks)} chunks extracted")
+        if background:
+            job = await run_in_threadpool(job_service.enqueue, file_name, file.content_type or "")
+            job_service.start_workers(_process_ingest_job)
+            return {
+                "success": True,
+                "file_name": file_name,
+                "job_id": job["job_id"],
+                "status": job["status"],
+                "blob_url": blob_result["url"]
+            }
 
-        # Index each chunk separately with AI-generated title and category
-        indexed_count = 0
-        chunk_results = []
+        # Extract text content as chunks
+        # Index each chunk separately with AI-generated title and category (enriched concurrently)
+        if streaming:
+            # 抽出しながらバッチ単位でエンリッチ・インデックス登録
+            chunks, file_type = TextExtractor.iter_chunks_from_file(temp_path, file_name, file.content_type or "")
+            chunk_results = await run_in_threadpool(_index_chunk_stream, file_name, chunks)
+        else:
+            chunks, file_type = await run_in_threadpool(
+                TextExtractor.extract_chunks,
+                content,
+                file_name,
+                file.content_type or ""
+            )
+            chunk_results = await run_in_threadpool(ingest_service.index_chunks, file_name, chunks)
+        print(f"[{file_type}] {file_name}: {len(chunk_results)} chunks extracted")
 
-        for chunk in chunks:
-            doc_id = str(uuid.uuid4())
-            try:
-                # AIでタイトルとカテゴリを生成
-                try:
-                    ai_title = openai_service.generate_chunk_title(chunk.text)
-                except Exception:
-                    ai_title = f"{file_name} - {chunk.chunk_id}"
+        indexed_count = sum(1 for r in chunk_results if r["status"] == "indexed")
 
-                try:
-                    ai_category = openai_service.categorize_chunk(chunk.text)
-                except Exception:
-                    ai_category = "その他"
-
-                embedding = openai_service.generate_embedding(chunk.text)
-                search_service.index_document(
-                    doc_id=doc_id,
-                    title=ai_title,
-                    content=chunk.text,
-                    file_name=file_name,
-                    embedding=embedding,
-                    category=ai_category
-                )
-                indexed_count += 1
-                chunk_results.append({
-                    "chunk_id": chunk.chunk_id,
-                    "status": "indexed",
-                    "chars": len(chunk.text),
-                    "title": ai_title,
-                    "category": ai_category
-                })
-                print(f"  [OK] {chunk.chunk_id}: {len(chunk.text)} chars | {ai_title} | {ai_category}")
-            except Exception as e:
-                chunk_results.append({
-                    "chunk_id": chunk.chunk_id,
-                    "status": "error",
-                    "error": str(e)
-                })
-                print(f"  [WARN] {chunk.chunk_id}: {e}")
+        # マニフェストを更新し、同名ファイルの前回分のチャンクを削除
+        await run_in_threadpool(
+            ingest_service.record_file,
+            file_name,
+            chunk_results,
+            content_hash,
+            etag=blob_result.get("etag"),
+            last_modified=blob_result.get("last_modified")
+        )
 
         return {
             "success": True,
             "file_name": file_name,
             "file_type": file_type,
-            "total_chunks": len(chunks),
+            "total_chunks": len(chunk_results),
             "indexed_chunks": indexed_count,
             "chunks": chunk_results,
             "blob_url": blob_result["url"]
         }
+    except HTTPException:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise HTTPException(status_code=_error_status(e), detail=str(e))
+    finally:
+        if temp_path:
+            os.remove(temp_path)
+
+
+@fastapi_app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Get the status, progress and per-chunk results of an ingest job"""
+    job = await run_in_threadpool(job_service.get_job, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
 
 
 @fastapi_app.get("/api/documents")
 async def list_documents():
     """List all documents in storage"""
     try:
-        documents = blob_service.list_documents()
+        documents = await run_in_threadpool(blob_service.list_documents)
         return {"documents": documents}
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise HTTPException(status_code=_error_status(e), detail=str(e))
 
 
 @fastapi_app.delete("/api/documents/{file_name:path}")
 async def delete_document(file_name: str):
-    """Delete a document from storage"""
+    """Delete a document from storage and purge its chunks from the search index"""
     try:
-        result = blob_service.delete_document(file_name)
-        return {"success": result}
+        # 先にインデックスからファイルの全チャンクを削除（失敗時はBlobを残して再実行できるようにする）
+        index_result = await run_in_threadpool(search_service.delete_by_file, file_name)
+        if index_result["failed"]:
+            # 一部のチャンクが残っている間はマニフェストとBlobを残す（再実行で残りを削除できるようにする）
+            raise HTTPException(
+                status_code=502,
+                detail=f"Failed to delete {len(index_result['failed'])} chunk(s) from the search index"
+            )
+        index_manifest.delete(file_name)
+        result = await run_in_threadpool(blob_service.delete_document, file_name)
+        return {"success": result, "deleted_chunks": index_result["deleted"]}
+    except HTTPException:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise HTTPException(status_code=_error_status(e), detail=str(e))
 
 
 # Search endpoints
@@ -188,20 +385,22 @@ async def search_documents(request: SearchRequest):
     """Search documents"""
     try:
         if request.use_vector:
-            embedding = openai_service.generate_embedding(request.query)
-            results = search_service.hybrid_search(
+            embedding = await run_in_threadpool(openai_service.generate_embedding, request.query)
+            results = await run_in_threadpool(
+                search_service.hybrid_search,
                 query=request.query,
                 query_vector=embedding,
                 top=request.top
             )
         else:
-            results = search_service.search(
+            results = await run_in_threadpool(
+                search_service.search,
                 query=request.query,
                 top=request.top
             )
         return {"results": results}
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise HTTPException(status_code=_error_status(e), detail=str(e))
 
 
 # AI endpoints
@@ -209,13 +408,14 @@ async def search_documents(request: SearchRequest):
 async def summarize_text(request: SummarizeRequest):
     """Summarize text using Azure OpenAI"""
     try:
-        summary = openai_service.summarize(
+        summary = await run_in_threadpool(
+            openai_service.summarize,
             text=request.text,
             max_length=request.max_length
         )
         return {"summary": summary}
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise HTTPException(status_code=_error_status(e), detail=str(e))
 
 
 @fastapi_app.post("/api/ai/question")
@@ -226,23 +426,26 @@ async def answer_question(request: QuestionRequest):
         context = request.context
         if not context:
             try:
-                embedding = openai_service.generate_embedding(request.question)
-                results = search_service.hybrid_search(
+                embedding = await run_in_threadpool(openai_service.generate_embedding, request.question)
+                results = await run_in_threadpool(
+                    search_service.hybrid_search,
                     query=request.question,
                     query_vector=embedding,
                     top=3
                 )
                 context = "\n\n".join([r["content"] for r in results])
-            except Exception:
+            except Exception as e:
+                print(f"[WARN] Context search failed, answering without context: {e}")
                 context = ""
 
-        answer = openai_service.answer_question(
+        answer = await run_in_threadpool(
+            openai_service.answer_question,
             question=request.question,
             context=context
         )
         return {"answer": answer}
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise HTTPException(status_code=_error_status(e), detail=str(e))
 
 
 @fastapi_app.post("/api/ai/chat")
@@ -253,28 +456,29 @@ async def chat(request: ChatRequest):
         if request.use_search and request.messages:
             last_message = request.messages[-1].content
             try:
-                embedding = openai_service.generate_embedding(last_message)
-                results = search_service.hybrid_search(
+                embedding = await run_in_threadpool(openai_service.generate_embedding, last_message)
+                results = await run_in_threadpool(
+                    search_service.hybrid_search,
                     query=last_message,
                     query_vector=embedding,
                     top=5,
                     use_semantic=request.use_semantic
                 )
                 context = "\n\n---\n\n".join([r["content"] for r in results])
-            except Exception:
-                pass
+            except Exception as e:
+                print(f"[WARN] Context search failed, chatting without context: {e}")
 
         messages = [{"role": m.role, "content": m.content} for m in request.messages]
 
         # Use chat_with_tools to enable Function Calling
-        result = openai_service.chat_with_tools(messages=messages, context=context)
+        result = await run_in_threadpool(openai_service.chat_with_tools, messages=messages, context=context)
 
         return {
             "response": result["response"],
             "tool_calls": result.get("tool_calls", [])
         }
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise HTTPException(status_code=_error_status(e), detail=str(e))
 
 
 # Employee endpoints
@@ -282,34 +486,34 @@ async def chat(request: ChatRequest):
 async def list_employees():
     """Get all registered employees"""
     try:
-        employees = employee_service.get_all_employees()
+        employees = await run_in_threadpool(employee_service.get_all_employees)
         return {"employees": employees}
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise HTTPException(status_code=_error_status(e), detail=str(e))
 
 
 @fastapi_app.get("/api/employees/{user_id}")
 async def get_employee(user_id: int):
     """Get a specific employee by ID"""
     try:
-        employee = employee_service.get_employee_by_id(user_id)
+        employee = await run_in_threadpool(employee_service.get_employee_by_id, user_id)
         if employee:
             return employee
         raise HTTPException(status_code=404, detail="Employee not found")
     except HTTPException:
         raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise HTTPException(status_code=_error_status(e), detail=str(e))
 
 
 @fastapi_app.delete("/api/employees/{user_id}")
 async def delete_employee(user_id: int):
     """Delete an employee by ID"""
     try:
-        result = employee_service.delete_employee(user_id)
+        result = await run_in_threadpool(employee_service.delete_employee, user_id)
         return {"success": result}
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise HTTPException(status_code=_error_status(e), detail=str(e))
 
 
 # Admin endpoints
@@ -317,10 +521,10 @@ async def delete_employee(user_id: int):
 async def create_search_index():
     """Create or update the search index"""
     try:
-        search_service.create_index()
+        await run_in_threadpool(search_service.create_index)
         return {"success": True, "message": "Index created successfully"}
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise HTTPException(status_code=_error_status(e), detail=str(e))
 
 
 @fastapi_app.post("/api/admin/auth")
@@ -340,10 +544,11 @@ async def clear_search_index(request: AdminAuthRequest):
         raise HTTPException(status_code=401, detail="Invalid password")
 
     try:
-        result = search_service.clear_all()
+        result = await run_in_threadpool(search_service.clear_all)
+        index_manifest.clear()
         return {"success": True, "message": "Search index cleared", **result}
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise HTTPException(status_code=_error_status(e), detail=str(e))
 
 
 @fastapi_app.post("/api/admin/clear-storage")
@@ -353,97 +558,162 @@ async def clear_blob_storage(request: AdminAuthRequest):
         raise HTTPException(status_code=401, detail="Invalid password")
 
     try:
-        result = blob_service.clear_all()
+        result = await run_in_threadpool(blob_service.clear_all)
         return {"success": True, "message": "Blob storage cleared", **result}
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise HTTPException(status_code=_error_status(e), detail=str(e))
+
+
+async def _reindex_file(doc: dict, entry: Optional[dict], full: bool,
+                        download_pool: ThreadPoolExecutor, extract_pool: ProcessPoolExecutor) -> dict:
+    """1ファイル分の再インデックス: ダウンロード（スレッド）→ 抽出（プロセス）→ エンリッチ・登録（共有ワーカープール）"""
+    loop = asyncio.get_running_loop()
+    file_name = doc["name"]
+    timing = {}
+
+    started = time.perf_counter()
+    content = await loop.run_in_executor(download_pool, blob_service.get_document, file_name)
+    timing["download_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    if not content:
+        return {"file": file_name, "status": "not_found", "chunks": 0, "timing": timing}
+
+    # 内容が同じ（ETagだけ変わった）場合はマニフェストの更新のみ
+    content_hash = hashlib.sha256(content).hexdigest()
+    if not full and entry and entry["content_hash"] == content_hash:
+        index_manifest.update_blob_info(file_name, doc.get("etag"), doc.get("last_modified"))
+        return {"file": file_name, "status": "unchanged", "chunks": len(entry["chunk_ids"]), "timing": timing}
+
+    # 中身が対応形式でないファイル（旧形式のOffice・バイナリ等）は抽出・インデックス登録しない
+    if TextExtractor.resolve_file_type(content, file_name) == "Unknown":
+        print(f"[WARN] {file_name}: unsupported file format, skipped")
+        return {"file": file_name, "status": "unsupported", "chunks": 0, "timing": timing}
+
+    # Extract chunks（PyMuPDF等の解析はCPU負荷が高くGILを握るため別プロセスで実行）
+    # 内容・抽出設定が同じファイルは抽出キャッシュから復元する
+    started = time.perf_counter()
+    cache_key = ExtractionCache.cache_key(content_hash) if extraction_cache else None
+    cached = await run_in_threadpool(extraction_cache.get, cache_key) if extraction_cache else None
+    if cached:
+        chunks, file_type = cached
+    else:
+        chunks, file_type = await loop.run_in_executor(extract_pool, TextExtractor.extract_chunks, content, file_name, "")
+        if extraction_cache:
+            await run_in_threadpool(extraction_cache.put, cache_key, chunks, file_type)
+    timing["extract_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    timing["extract_cache"] = "hit" if cached else "miss"
+    del content
+    print(f"[{file_type}] {file_name}: {len(chunks)} chunks")
+
+    # Index each chunk with AI-generated title and category (enriched concurrently)
+    started = time.perf_counter()
+    chunk_results = await run_in_threadpool(ingest_service.index_chunks, file_name, chunks)
+    await run_in_threadpool(
+        ingest_service.record_file,
+        file_name,
+        chunk_results,
+        content_hash,
+        etag=doc.get("etag"),
+        last_modified=doc.get("last_modified")
+    )
+    timing["index_ms"] = round((time.perf_counter() - started) * 1000, 1)
+
+    return {
+        "file": file_name,
+        "status": "indexed",
+        "file_type": file_type,
+        "chunks": len(chunks),
+        "indexed": sum(1 for r in chunk_results if r["status"] == "indexed"),
+        "timing": timing
+    }
 
 
 @fastapi_app.post("/api/admin/reindex-all")
-async def reindex_all_documents():
-    """Re-index all documents from Blob Storage (chunk by chunk)"""
+async def reindex_all_documents(full: bool = False):
+    """Re-index documents from Blob Storage (chunk by chunk)
+
+    マニフェストと比較して新規・変更ファイルだけを処理し、削除されたファイルのチャンクを
+    インデックスから取り除く。full=true の場合は全ファイルを再処理する。
+    複数ファイルはダウンロード・抽出・エンリッチを重ねて並列に処理する。
+    """
     try:
         # First, create index if it doesn't exist
         try:
-            search_service.create_index()
+            await run_in_threadpool(search_service.create_index)
             print("[OK] Index created/verified")
         except Exception as e:
             print(f"[WARN] Index creation: {e}")
 
         # Get all documents from Blob Storage
-        documents = blob_service.list_documents()
+        documents = await run_in_threadpool(blob_service.list_documents)
+        manifest_entries = index_manifest.all()
         results = []
-        total_chunks = 0
-        indexed_chunks = 0
+        targets = []
 
         for doc in documents:
-            file_name = doc["name"]
-            print(f"\n[Processing] {file_name}...")
-
+            entry = manifest_entries.get(doc["name"])
+            # ETagが変わっていなければスキップ
+            if not full and entry and doc.get("etag") and entry["etag"] == doc["etag"]:
+                results.append({"file": doc["name"], "status": "unchanged", "chunks": len(entry["chunk_ids"])})
+            else:
+                targets.append((doc, entry))
+
+        started = time.perf_counter()
+        semaphore = asyncio.Semaphore(REINDEX_MAX_FILES_IN_FLIGHT)
+
+        async def process(doc: dict, entry: Optional[dict]) -> dict:
+            async with semaphore:
+                print(f"\n[Processing] {doc['name']}...")
+                file_started = time.perf_counter()
+                try:
+                    result = await _reindex_file(doc, entry, full, download_pool, extract_pool)
+                except Exception as e:
+                    print(f"  [ERROR] {doc['name']}: {e}")
+                    result = {"file": doc["name"], "status": "error", "error": str(e), "timing": {}}
+                result["timing"]["total_ms"] = round((time.perf_counter() - file_started) * 1000, 1)
+                return result
+
+        with ThreadPoolExecutor(max_workers=REINDEX_DOWNLOAD_WORKERS, thread_name_prefix="reindex-download") as download_pool, \
+                ProcessPoolExecutor(max_workers=REINDEX_EXTRACT_WORKERS, mp_context=process_pool_context()) as extract_pool:
+            results.extend(await asyncio.gather(*(process(doc, entry) for doc, entry in targets)))
+
+        # Blobから削除されたファイルのチャンクをインデックスから削除
+        blob_names = {doc["name"] for doc in documents}
+        deleted_files = 0
+        for file_name, entry in manifest_entries.items():
+            if file_name in blob_names:
+                continue
             try:
-                # Download file content
-                content = blob_service.get_document(file_name)
-                if not content:
-                    results.append({"file": file_name, "status": "not_found", "chunks": 0})
+                index_result = await run_in_threadpool(search_service.delete_by_file, file_name)
+                purged = index_result["deleted"]
+                if index_result["failed"]:
+                    # マニフェストを残し、次回の再インデックスで残りのチャンクを削除する
+                    print(f"[ERROR] {file_name}: {len(index_result['failed'])} chunks could not be purged")
+                    results.append({"file": file_name, "status": "error", "chunks": purged,
+                                    "error": f"Failed to delete {len(index_result['failed'])} chunk(s)"})
                     continue
-
-                # Extract chunks
-                chunks, file_type = TextExtractor.extract_chunks(content, file_name, "")
-                print(f"  [{file_type}] {len(chunks)} chunks")
-
-                # Index each chunk with AI-generated title and category
-                file_indexed = 0
-                for chunk in chunks:
-                    doc_id = str(uuid.uuid4())
-                    try:
-                        # AIでタイトルとカテゴリを生成
-                        try:
-                            ai_title = openai_service.generate_chunk_title(chunk.text)
-                        except Exception:
-                            ai_title = f"{file_name} - {chunk.chunk_id}"
-
-                        try:
-                            ai_category = openai_service.categorize_chunk(chunk.text)
-                        except Exception:
-                            ai_category = "その他"
-
-                        embedding = openai_service.generate_embedding(chunk.text)
-                        search_service.index_document(
-                            doc_id=doc_id,
-                            title=ai_title,
-                            content=chunk.text,
-                            file_name=file_name,
-                            embedding=embedding,
-                            category=ai_category
-                        )
-                        file_indexed += 1
-                        indexed_chunks += 1
-                        print(f"    [OK] {chunk.chunk_id}: {len(chunk.text)} chars | {ai_title} | {ai_category}")
-                    except Exception as e:
-                        print(f"    [WARN] {chunk.chunk_id}: {e}")
-
-                total_chunks += len(chunks)
-                results.append({
-                    "file": file_name,
-                    "status": "indexed",
-                    "file_type": file_type,
-                    "chunks": len(chunks),
-                    "indexed": file_indexed
-                })
-
+                index_manifest.delete(file_name)
+                deleted_files += 1
+                results.append({"file": file_name, "status": "deleted", "chunks": purged})
+                print(f"[Deleted] {file_name}: {purged} chunks purged")
             except Exception as e:
-                print(f"  [ERROR] {e}")
+                print(f"[ERROR] {file_name}: {e}")
                 results.append({"file": file_name, "status": "error", "error": str(e)})
 
+        indexed_results = [r for r in results if r["status"] == "indexed"]
         return {
             "success": True,
+            "full": full,
             "total_files": len(documents),
-            "total_chunks": total_chunks,
-            "indexed_chunks": indexed_chunks,
+            "skipped_files": sum(1 for r in results if r["status"] == "unchanged"),
+            "unsupported_files": sum(1 for r in results if r["status"] == "unsupported"),
+            "deleted_files": deleted_files,
+            "total_chunks": sum(r["chunks"] for r in indexed_results),
+            "indexed_chunks": sum(r["indexed"] for r in indexed_results),
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
             "results": results
         }
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise HTTPException(status_code=_error_status(e), detail=str(e))
 
 
 # Azure Functions用の変数（必ず 'app' という名前）
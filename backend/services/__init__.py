@@ -1,7 +1,13 @@
 from .blob_service import BlobService
 from .openai_service import OpenAIService
+from .search_backend import SearchBackend
 from .search_service import SearchService
-from .extractor_service import TextExtractor, Chunk
+from .local_search_service import LocalSearchService
+from .extractor_service import TextExtractor, Chunk, SpanChunk, process_pool_context
 from .employee_service import EmployeeService
+from .ingest_service import IngestService, EnrichedChunk, chunk_document_id
+from .job_service import JobService, JobStore, SQLiteJobStore, BlobJobStore
+from .manifest_service import IndexManifest
+from .extraction_cache import ExtractionCache
 
-__all__ = ["BlobService", "OpenAIService", "SearchService", "TextExtractor", "Chunk", "EmployeeService"]
+__all__ = ["BlobService", "OpenAIService", "SearchBackend", "SearchService", "LocalSearchService", "TextExtractor", "Chunk", "SpanChunk", "process_pool_context", "EmployeeService", "IngestService", "EnrichedChunk", "chunk_document_id", "JobService", "JobStore", "SQLiteJobStore", "BlobJobStore", "IndexManifest", "ExtractionCache"]
@@ -1,20 +1,37 @@
 import os
+from azure.core.exceptions import ResourceNotFoundError
 from azure.storage.blob import BlobServiceClient, ContentSettings
 from typing import Optional
 
+from .resilience import resilient_call, is_transient_azure_error
+
 
 class BlobService:
+    # ブロック単位の転送設定（大きいファイルはブロックに分けて並列に転送する）
+    MAX_BLOCK_SIZE = int(os.getenv("AZURE_STORAGE_MAX_BLOCK_SIZE", str(4 * 1024 * 1024)))
+    MAX_SINGLE_PUT_SIZE = int(os.getenv("AZURE_STORAGE_MAX_SINGLE_PUT_SIZE", str(8 * 1024 * 1024)))
+    TRANSFER_CONCURRENCY = int(os.getenv("AZURE_STORAGE_TRANSFER_CONCURRENCY", "4"))
+
     def __init__(self):
         connection_string = os.getenv("AZURE_STORAGE_CONNECTION_STRING")
         self.container_name = os.getenv("AZURE_STORAGE_CONTAINER_NAME", "documents")
 
         if connection_string:
-            self.blob_service_client = BlobServiceClient.from_connection_string(connection_string)
+            self.blob_service_client = BlobServiceClient.from_connection_string(
+                connection_string,
+                max_block_size=self.MAX_BLOCK_SIZE,
+                max_single_put_size=self.MAX_SINGLE_PUT_SIZE,
+                retry_total=0  # 再試行はレジリエンス層で行う
+            )
             self.container_client = self.blob_service_client.get_container_client(self.container_name)
         else:
             self.blob_service_client = None
             self.container_client = None
 
+    def _call(self, fn, *args, **kwargs):
+        """Blob Storage の呼び出しを再試行・サーキットブレーカー付きで実行"""
+        return resilient_call("azure_blob", fn, *args, is_transient=is_transient_azure_error, **kwargs)
+
     def upload_document(self, file_name: str, file_content: bytes, content_type: str = "application/octet-stream") -> dict:
         """Upload a document to Azure Blob Storage"""
         if not self.container_client:
@@ -23,7 +40,8 @@ class BlobService:
         blob_client = self.container_client.get_blob_client(file_name)
         content_settings = ContentSettings(content_type=content_type)
 
-        blob_client.upload_blob(
+        result = self._call(
+            blob_client.upload_blob,
             file_content,
             overwrite=True,
             content_settings=content_settings
@@ -32,9 +50,57 @@ class BlobService:
         return {
             "file_name": file_name,
             "url": blob_client.url,
-            "container": self.container_name
+            "container": self.container_name,
+            "etag": result.get("etag") if result else None,
+            "last_modified": result["last_modified"].isoformat() if result and result.get("last_modified") else None
+        }
+
+    def upload_document_from_file(self, file_name: str, file_path: str, content_type: str = "application/octet-stream") -> dict:
+        """Upload a local file to Azure Blob Storage, streaming it in parallel blocks"""
+        if not self.container_client:
+            raise Exception("Azure Storage is not configured")
+
+        blob_client = self.container_client.get_blob_client(file_name)
+        content_settings = ContentSettings(content_type=content_type)
+
+        def upload():
+            # 再試行時は先頭から読み直す
+            with open(file_path, "rb") as stream:
+                return blob_client.upload_blob(
+                    stream,
+                    length=os.path.getsize(file_path),
+                    overwrite=True,
+                    content_settings=content_settings,
+                    max_concurrency=self.TRANSFER_CONCURRENCY
+                )
+
+        result = self._call(upload)
+
+        return {
+            "file_name": file_name,
+            "url": blob_client.url,
+            "container": self.container_name,
+            "etag": result.get("etag") if result else None,
+            "last_modified": result["last_modified"].isoformat() if result and result.get("last_modified") else None
         }
 
+    def download_to_file(self, file_name: str, file_path: str) -> bool:
+        """Download a document from Azure Blob Storage into a local file (without buffering it in memory)"""
+        if not self.container_client:
+            raise Exception("Azure Storage is not configured")
+
+        blob_client = self.container_client.get_blob_client(file_name)
+
+        def download():
+            with open(file_path, "wb") as f:
+                blob_client.download_blob(max_concurrency=self.TRANSFER_CONCURRENCY).readinto(f)
+
+        try:
+            self._call(download)
+            return True
+        except ResourceNotFoundError:
+            return False
+
     def get_document(self, file_name: str) -> Optional[bytes]:
         """Get a document from Azure Blob Storage"""
         if not self.container_client:
@@ -42,9 +108,8 @@ class BlobService:
 
         blob_client = self.container_client.get_blob_client(file_name)
         try:
-            download_stream = blob_client.download_blob()
-            return download_stream.readall()
-        except Exception:
+            return self._call(lambda: blob_client.download_blob().readall())
+        except ResourceNotFoundError:
             return None
 
     def list_documents(self) -> list:
@@ -52,12 +117,13 @@ class BlobService:
         if not self.container_client:
             raise Exception("Azure Storage is not configured")
 
-        blobs = self.container_client.list_blobs()
+        blobs = self._call(lambda: list(self.container_client.list_blobs()))
         return [
             {
                 "name": blob.name,
                 "size": blob.size,
-                "last_modified": blob.last_modified.isoformat() if blob.last_modified else None
+                "last_modified": blob.last_modified.isoformat() if blob.last_modified else None,
+                "etag": blob.etag
             }
             for blob in blobs
         ]
@@ -69,9 +135,9 @@ class BlobService:
 
         blob_client = self.container_client.get_blob_client(file_name)
         try:
-            blob_client.delete_blob()
+            self._call(blob_client.delete_blob)
             return True
-        except Exception:
+        except ResourceNotFoundError:
             return False
 
     def clear_all(self) -> dict:
@@ -82,11 +148,11 @@ class BlobService:
         deleted_count = 0
         errors = []
 
-        blobs = self.container_client.list_blobs()
+        blobs = self._call(lambda: list(self.container_client.list_blobs()))
         for blob in blobs:
             try:
                 blob_client = self.container_client.get_blob_client(blob.name)
-                blob_client.delete_blob()
+                self._call(blob_client.delete_blob)
                 deleted_count += 1
             except Exception as e:
                 errors.append({"name": blob.name, "error": str(e)})
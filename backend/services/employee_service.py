@@ -2,6 +2,13 @@ import os
 import pyodbc
 from typing import List, Optional, Dict, Any
 
+from .resilience import resilient_call
+
+
+def _is_transient_sql_error(error: Exception) -> bool:
+    """接続エラー・タイムアウトなど再試行すべき pyodbc のエラー"""
+    return isinstance(error, (pyodbc.OperationalError, pyodbc.InterfaceError))
+
 
 class EmployeeService:
     """社員情報のCRUD操作を行うサービス
@@ -34,8 +41,8 @@ class EmployeeService:
         return self._connection_string
 
     def _get_connection(self):
-        """データベース接続を取得"""
-        return pyodbc.connect(self.connection_string)
+        """データベース接続を取得（一時的な接続エラーは再試行）"""
+        return resilient_call("azure_sql", pyodbc.connect, self.connection_string, is_transient=_is_transient_sql_error)
 
     def register_employee(
         self,
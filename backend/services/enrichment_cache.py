@@ -0,0 +1,231 @@
+import os
+import mmap
+import sqlite3
+import struct
+import hashlib
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import List, Optional, Dict, Any
+
+
+class EnrichmentCache:
+    """チャンクのエンリッチ結果キャッシュ（キー: チャンク本文の sha256 + モデル名）
+
+    埋め込みは固定長スロットのメモリマップファイル（float32 / float16）に保存し、
+    スロット番号・タイトル・カテゴリはサイドカーのSQLiteインデックスで管理する。
+    上限を超えた場合は最も長く使われていないエントリを追い出す。
+    同じディレクトリを複数のプロセスで共有できるよう、埋め込みの読み書きは SQLite の
+    書き込みロック（BEGIN IMMEDIATE）を取ってから行う。
+    """
+
+    CACHE_DIR = os.getenv("ENRICHMENT_CACHE_DIR", os.path.join(tempfile.gettempdir(), "enrichment_cache"))
+    MAX_ENTRIES = int(os.getenv("ENRICHMENT_CACHE_MAX_ENTRIES", "20000"))
+    DIMENSIONS = int(os.getenv("ENRICHMENT_CACHE_DIMENSIONS", "1536"))
+    DTYPE = os.getenv("ENRICHMENT_CACHE_DTYPE", "float32")
+
+    _STRUCT_FORMATS = {"float32": "f", "float16": "e"}
+
+    def __init__(self, cache_dir: Optional[str] = None, max_entries: Optional[int] = None,
+                 dimensions: Optional[int] = None, dtype: Optional[str] = None):
+        self.cache_dir = cache_dir or self.CACHE_DIR
+        self.max_entries = max_entries or self.MAX_ENTRIES
+        self.dimensions = dimensions or self.DIMENSIONS
+        self.dtype = dtype or self.DTYPE
+        if self.dtype not in self._STRUCT_FORMATS:
+            raise ValueError(f"Unsupported cache dtype: {self.dtype}")
+
+        self._vector_format = f"<{self.dimensions}{self._STRUCT_FORMATS[self.dtype]}"
+        self._slot_size = struct.calcsize(self._vector_format)
+        self._lock = threading.Lock()
+        self._stats = {"embedding_hits": 0, "embedding_misses": 0, "enrichment_hits": 0, "enrichment_misses": 0, "evictions": 0}
+
+        # 次元数・型ごとにベクトルファイルとスロットの表を分ける（設定変更時に別のファイルのスロットを読まないため）
+        layout = f"{self.dimensions}_{self.dtype}"
+        self._table = f"embeddings_{layout}"
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._conn = sqlite3.connect(os.path.join(self.cache_dir, "index.db"), check_same_thread=False, timeout=30)
+        self._conn.executescript(
+            f"""
+            -- 次元数・型ごとに表を分ける前の表（どのベクトルファイルのスロットか分からないため破棄）
+            DROP TABLE IF EXISTS embeddings;
+            CREATE TABLE IF NOT EXISTS {self._table} (
+                text_hash TEXT NOT NULL,
+                model TEXT NOT NULL,
+                slot INTEGER NOT NULL UNIQUE,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (text_hash, model)
+            );
+            CREATE TABLE IF NOT EXISTS enrichments (
+                text_hash TEXT NOT NULL,
+                model TEXT NOT NULL,
+                title TEXT NOT NULL,
+                category TEXT NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (text_hash, model)
+            );
+            CREATE INDEX IF NOT EXISTS idx_{self._table}_last_used ON {self._table} (last_used);
+            CREATE INDEX IF NOT EXISTS idx_enrichments_last_used ON enrichments (last_used);
+            """
+        )
+
+        vector_path = os.path.join(self.cache_dir, f"vectors_{layout}.bin")
+        if not os.path.exists(vector_path):
+            open(vector_path, "wb").close()
+        self._vector_file = open(vector_path, "r+b")
+        self._vector_file.truncate(max(os.path.getsize(vector_path), self.max_entries * self._slot_size))
+        self._vectors = mmap.mmap(self._vector_file.fileno(), self.max_entries * self._slot_size)
+
+        # 上限を小さくした場合、範囲外のスロットを指すエントリは破棄する
+        with self._lock, self._write_transaction():
+            self._conn.execute(f"DELETE FROM {self._table} WHERE slot >= ?", (self.max_entries,))
+
+    @contextmanager
+    def _write_transaction(self):
+        """書き込みロックを取ったトランザクション（他のプロセスのスロット割り当て・書き込みと直列化する）"""
+        with self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            yield
+
+    @staticmethod
+    def text_hash(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def get_embeddings(self, texts: List[str], model: str) -> List[Optional[List[float]]]:
+        """キャッシュ済みの埋め込みを返す（未キャッシュは None）"""
+        hashes = [self.text_hash(text) for text in texts]
+        now = time.time()
+        results: List[Optional[List[float]]] = []
+
+        with self._lock, self._write_transaction():
+            for text_hash in hashes:
+                row = self._conn.execute(
+                    f"SELECT slot FROM {self._table} WHERE text_hash = ? AND model = ?",
+                    (text_hash, model)
+                ).fetchone()
+                vector = None
+                if row is not None:
+                    offset = row[0] * self._slot_size
+                    vector = list(struct.unpack(self._vector_format, self._vectors[offset:offset + self._slot_size]))
+                    # 書き込まれていないスロット（すべて 0）は未キャッシュとして扱う
+                    if not any(vector):
+                        vector = None
+                if vector is None:
+                    self._stats["embedding_misses"] += 1
+                    results.append(None)
+                    continue
+
+                self._stats["embedding_hits"] += 1
+                self._conn.execute(
+                    f"UPDATE {self._table} SET last_used = ? WHERE text_hash = ? AND model = ?",
+                    (now, text_hash, model)
+                )
+                results.append(vector)
+
+        return results
+
+    def put_embeddings(self, texts: List[str], embeddings: List[List[float]], model: str):
+        """埋め込みを保存（満杯の場合は最も古いスロットを再利用）"""
+        now = time.time()
+        with self._lock, self._write_transaction():
+            for text, embedding in zip(texts, embeddings):
+                if len(embedding) != self.dimensions:
+                    continue
+                text_hash = self.text_hash(text)
+
+                row = self._conn.execute(
+                    f"SELECT slot FROM {self._table} WHERE text_hash = ? AND model = ?",
+                    (text_hash, model)
+                ).fetchone()
+                if row is not None:
+                    slot = row[0]
+                else:
+                    slot = self._allocate_slot()
+                    self._conn.execute(
+                        f"INSERT INTO {self._table} (text_hash, model, slot, last_used) VALUES (?, ?, ?, ?)",
+                        (text_hash, model, slot, now)
+                    )
+
+                offset = slot * self._slot_size
+                self._vectors[offset:offset + self._slot_size] = struct.pack(self._vector_format, *embedding)
+
+    def _allocate_slot(self) -> int:
+        """空きスロットを返す。満杯なら最も長く使われていない埋め込みを追い出してそのスロットを使う
+
+        追い出し時は同じスロットを再利用するため、使用中のスロットは常に 0..件数-1 に収まる。
+        書き込みロック（_write_transaction）の中で呼ぶ。
+        """
+        count = self._conn.execute(f"SELECT COUNT(*) FROM {self._table}").fetchone()[0]
+        if count < self.max_entries:
+            return count
+
+        text_hash, model, slot = self._conn.execute(
+            f"SELECT text_hash, model, slot FROM {self._table} ORDER BY last_used LIMIT 1"
+        ).fetchone()
+        self._conn.execute(f"DELETE FROM {self._table} WHERE text_hash = ? AND model = ?", (text_hash, model))
+        self._stats["evictions"] += 1
+        return slot
+
+    def get_enrichment(self, text: str, model: str) -> Optional[Dict[str, str]]:
+        """キャッシュ済みのタイトル・カテゴリを返す（未キャッシュは None）"""
+        text_hash = self.text_hash(text)
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT title, category FROM enrichments WHERE text_hash = ? AND model = ?",
+                (text_hash, model)
+            ).fetchone()
+            if row is None:
+                self._stats["enrichment_misses"] += 1
+                return None
+
+            self._stats["enrichment_hits"] += 1
+            self._conn.execute(
+                "UPDATE enrichments SET last_used = ? WHERE text_hash = ? AND model = ?",
+                (time.time(), text_hash, model)
+            )
+        return {"title": row[0], "category": row[1]}
+
+    def put_enrichment(self, text: str, model: str, title: str, category: str):
+        """タイトル・カテゴリを保存（上限を超えた分は古い順に削除）"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO enrichments (text_hash, model, title, category, last_used) VALUES (?, ?, ?, ?, ?)",
+                (self.text_hash(text), model, title, category, time.time())
+            )
+            evicted = self._conn.execute(
+                """
+                DELETE FROM enrichments WHERE rowid IN (
+                    SELECT rowid FROM enrichments ORDER BY last_used DESC LIMIT -1 OFFSET ?
+                )
+                """,
+                (self.max_entries,)
+            ).rowcount
+            self._stats["evictions"] += max(evicted, 0)
+
+    def clear(self):
+        """キャッシュを全削除"""
+        with self._lock, self._conn:
+            self._conn.execute(f"DELETE FROM {self._table}")
+            self._conn.execute("DELETE FROM enrichments")
+
+    def stats(self) -> Dict[str, Any]:
+        """ヒット・ミス数と使用量を返す"""
+        with self._lock:
+            embeddings = self._conn.execute(f"SELECT COUNT(*) FROM {self._table}").fetchone()[0]
+            enrichments = self._conn.execute("SELECT COUNT(*) FROM enrichments").fetchone()[0]
+            stats = dict(self._stats)
+
+        for kind in ("embedding", "enrichment"):
+            total = stats[f"{kind}_hits"] + stats[f"{kind}_misses"]
+            stats[f"{kind}_hit_rate"] = round(stats[f"{kind}_hits"] / total, 3) if total else 0.0
+
+        stats.update({
+            "embedding_entries": embeddings,
+            "enrichment_entries": enrichments,
+            "max_entries": self.max_entries,
+            "dtype": self.dtype,
+            "vector_file_bytes": self.max_entries * self._slot_size
+        })
+        return stats
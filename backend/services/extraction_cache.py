@@ -0,0 +1,127 @@
+import os
+import json
+import zlib
+import sqlite3
+import hashlib
+import tempfile
+import threading
+import time
+from typing import List, Optional, Tuple, Dict, Any
+
+from .extractor_service import TextExtractor, Chunk
+
+
+class ExtractionCache:
+    """抽出結果（チャンク一覧）のキャッシュ（キー: ファイル内容の sha256 + 抽出器のバージョン・設定）
+
+    チャンク一覧は JSON を zlib で圧縮してSQLiteに保存する。合計サイズが上限を超えた場合は
+    最も長く使われていないエントリから追い出す。内容が同じファイルの再インデックスでは解析を省略できる。
+    """
+
+    DB_PATH = os.getenv("EXTRACTION_CACHE_PATH", os.path.join(tempfile.gettempdir(), "extraction_cache.db"))
+    MAX_BYTES = int(os.getenv("EXTRACTION_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+    COMPRESSION_LEVEL = 6
+
+    def __init__(self, db_path: Optional[str] = None, max_bytes: Optional[int] = None):
+        self.db_path = db_path or self.DB_PATH
+        self.max_bytes = max_bytes or self.MAX_BYTES
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0}
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        with self._conn:
+            self._conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS extractions (
+                    cache_key TEXT PRIMARY KEY,
+                    file_type TEXT NOT NULL,
+                    data BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    last_used REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_extractions_last_used ON extractions (last_used);
+                """
+            )
+
+    @staticmethod
+    def cache_key(content_hash: str) -> str:
+        """内容ハッシュと抽出器のバージョン・チャンク設定から決まるキー（形式は中身から判定するため含めない）"""
+        key = f"{content_hash}\x00{TextExtractor.cache_settings()}"
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Tuple[List[Chunk], str]]:
+        """キャッシュ済みの (chunks, file_type) を返す（未キャッシュは None）"""
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT file_type, data FROM extractions WHERE cache_key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self._stats["misses"] += 1
+                return None
+
+            self._stats["hits"] += 1
+            self._conn.execute("UPDATE extractions SET last_used = ? WHERE cache_key = ?", (time.time(), key))
+
+        file_type, data = row
+        chunks = [
+            Chunk(text=text, chunk_id=chunk_id, chunk_type=chunk_type)
+            for text, chunk_id, chunk_type in json.loads(zlib.decompress(data))
+        ]
+        return chunks, file_type
+
+    def put(self, key: str, chunks: List[Chunk], file_type: str):
+        """チャンク一覧を保存（抽出エラーは保存しない）"""
+        if file_type == "Error":
+            return
+
+        payload = json.dumps(
+            [[chunk.text, chunk.chunk_id, chunk.chunk_type] for chunk in chunks],
+            ensure_ascii=False,
+            separators=(",", ":")
+        )
+        data = zlib.compress(payload.encode("utf-8"), self.COMPRESSION_LEVEL)
+        if len(data) > self.max_bytes:
+            return
+
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO extractions (cache_key, file_type, data, size, last_used) VALUES (?, ?, ?, ?, ?)",
+                (key, file_type, data, len(data), time.time())
+            )
+            self._evict()
+
+    def _evict(self):
+        """合計サイズが上限以下になるまで古いエントリを削除"""
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM extractions").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        rows = self._conn.execute("SELECT cache_key, size FROM extractions ORDER BY last_used").fetchall()
+        evicted = []
+        for cache_key, size in rows:
+            if total <= self.max_bytes:
+                break
+            evicted.append((cache_key,))
+            total -= size
+        self._conn.executemany("DELETE FROM extractions WHERE cache_key = ?", evicted)
+        self._stats["evictions"] += len(evicted)
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM extractions")
+
+    def stats(self) -> Dict[str, Any]:
+        """ヒット・ミス数と使用量を返す"""
+        with self._lock:
+            entries, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM extractions"
+            ).fetchone()
+            stats = dict(self._stats)
+
+        lookups = stats["hits"] + stats["misses"]
+        stats.update({
+            "hit_rate": round(stats["hits"] / lookups, 3) if lookups else 0.0,
+            "entries": entries,
+            "total_bytes": total,
+            "max_bytes": self.max_bytes
+        })
+        return stats
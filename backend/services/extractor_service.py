@@ -1,8 +1,46 @@
 import io
-from typing import List, Tuple
+import os
+import re
+import mmap
+import codecs
+import zipfile
+import tempfile
+import posixpath
+import multiprocessing
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, Optional, Tuple, Union
 from dataclasses import dataclass
 
 
+_OLE_SIGNATURE = b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"
+# OOXML（ZIP）内の本体パート → 形式
+_OOXML_PARTS = {"word/document.xml": "Word", "xl/workbook.xml": "Excel", "ppt/presentation.xml": "PowerPoint"}
+# 中身から抽出できる形式
+_SUPPORTED_TYPES = ("PDF", "Word", "Excel", "PowerPoint", "Text")
+
+# OOXMLの名前空間
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_P = "{http://schemas.openxmlformats.org/presentationml/2006/main}"
+_A = "{http://schemas.openxmlformats.org/drawingml/2006/main}"
+_R = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+_PACKAGE_RELS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+# 文末（。！？.!?）の直後で文を区切る
+_SENTENCE_BOUNDARY = re.compile(r'(?<=[。！？.!?])\s*')
+# 見出し（■、●、【】、#、数字. など）の直前の改行
+_HEADING_BOUNDARY = re.compile(r'\n(?=(?:■|●|◆|▼|【|#|[0-9０-９]+[.．、)）]|\d+\.\s))')
+# ワーカープロセスの起動方式。fork はスレッド（イベントループのスレッドプールやジョブワーカー）を抱えた
+# プロセスをロックの状態ごと複製してしまうため使わない
+_PROCESS_START_METHOD = os.getenv("PROCESS_START_METHOD", "forkserver")
+
+
+def process_pool_context():
+    """ProcessPoolExecutor に渡す mp_context（forkserver が使えない環境では spawn）"""
+    method = _PROCESS_START_METHOD if _PROCESS_START_METHOD in multiprocessing.get_all_start_methods() else "spawn"
+    return multiprocessing.get_context(method)
+
+
 @dataclass
 class Chunk:
     """チャンク（分割されたテキスト単位）"""
@@ -12,133 +50,522 @@ class Chunk:
     category: str = ""  # カテゴリ（仕事, 家族, 趣味 など）- 後でAIが設定
 
 
+class SpanChunk:
+    """元テキスト上の区間として本文を持つコンパクトなチャンク（Chunk と同じ属性で扱える）
+
+    本文は source[start:end]（source は複数チャンクで共有する元テキスト）。見出し・オーバーラップは
+    小さな文字列として別に持ち、text は参照されたときに組み立てる。
+    """
+
+    __slots__ = ("source", "start", "end", "header", "overlap", "chunk_id", "chunk_type", "category")
+
+    def __init__(self, source: str, start: int, end: int, chunk_id: str, chunk_type: str,
+                 header: str = "", overlap: str = "", category: str = ""):
+        self.source = source
+        self.start = start
+        self.end = end
+        self.header = header
+        self.overlap = overlap
+        self.chunk_id = chunk_id
+        self.chunk_type = chunk_type
+        self.category = category
+
+    @property
+    def body(self) -> str:
+        """見出し・オーバーラップを除いた本文"""
+        return self.source[self.start:self.end]
+
+    @property
+    def text(self) -> str:
+        return f"{self.header}{self.overlap}{self.body}"
+
+    def append(self, separator: str, body: str):
+        """本文の末尾に追記（元テキスト上で続いている場合は区間を延ばすだけ）"""
+        if self.source.startswith(separator, self.end) and self.source.startswith(body, self.end + len(separator)):
+            self.end += len(separator) + len(body)
+        else:
+            self.source = self.body + separator + body
+            self.start, self.end = 0, len(self.source)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, (Chunk, SpanChunk)):
+            return NotImplemented
+        return (self.text, self.chunk_id, self.chunk_type, self.category) == \
+            (other.text, other.chunk_id, other.chunk_type, other.category)
+
+    def __repr__(self) -> str:
+        return f"SpanChunk(chunk_id={self.chunk_id!r}, chunk_type={self.chunk_type!r}, text={self.text!r})"
+
+
 class TextExtractor:
     """各種ファイル形式からテキストを抽出するサービス"""
 
+    # 抽出結果が変わる変更をしたら上げる（抽出キャッシュのキーに含まれる）
+    EXTRACTOR_VERSION = "3"
+
     # チャンクの設定（セマンティック検索最適化: 1チャンク = 1トピック）
     MAX_CHUNK_SIZE = 200      # チャンクの最大文字数（小さくして1トピックに）
     MIN_CHUNK_SIZE = 50       # チャンクの最小文字数
     OVERLAP_SIZE = 30         # チャンク間のオーバーラップ文字数
 
+    # このページ数以上のPDFはページ範囲ごとにプロセスプールで並列抽出する（0 で無効）
+    PDF_PARALLEL_PAGE_THRESHOLD = int(os.getenv("PDF_PARALLEL_PAGE_THRESHOLD", "100"))
+    PDF_PARALLEL_WORKERS = int(os.getenv("PDF_PARALLEL_WORKERS", str(os.cpu_count() or 2)))
+
+    # Excel: シートを行のウィンドウ単位でチャンク化する（各チャンクに見出し行を付ける）
+    EXCEL_STREAMING = os.getenv("EXCEL_STREAMING", "true").lower() == "true"
+    EXCEL_ROW_WINDOW = int(os.getenv("EXCEL_ROW_WINDOW", "20"))  # 1チャンクの最大行数
+    EXCEL_HEADER_MAX_CHARS = MAX_CHUNK_SIZE // 2  # 各チャンクに付ける見出し行の最大文字数
+
+    # Word / PowerPoint はXMLを直接読み、python-docx / python-pptx のオブジェクトを作らない
+    # （読めない構造の場合は従来の方法で読み直す）
+    OOXML_FAST_PATH = os.getenv("OOXML_FAST_PATH", "true").lower() == "true"
+
+    # 形式判定に読む先頭バイト数
+    SNIFF_BYTES = 8192
+
     @staticmethod
     def extract_chunks(file_content: bytes, file_name: str, content_type: str = "") -> Tuple[List[Chunk], str]:
         """
         ファイルからテキストをチャンク単位で抽出
         Returns: (chunks, file_type)
         """
+        return TextExtractor._extract_chunks_from_source(file_content, file_name, content_type)
+
+    @staticmethod
+    def extract_chunks_from_file(file_path: str, file_name: str, content_type: str = "") -> Tuple[List[Chunk], str]:
+        """
+        ローカルファイルからテキストをチャンク単位で抽出（ファイル全体を bytes として読み込まない）
+        Returns: (chunks, file_type)
+        """
+        return TextExtractor._extract_chunks_from_source(file_path, file_name, content_type)
+
+    @staticmethod
+    def iter_chunks(file_content: bytes, file_name: str, content_type: str = "") -> Tuple[Iterator[Chunk], str]:
+        """
+        ファイルからチャンクを読み進めながら順に返す（ページ・スライド・行を読んだ時点で yield）
+        Returns: (chunk iterator, file_type)
+        """
+        file_type = TextExtractor.resolve_file_type(file_content, file_name, content_type)
+        return TextExtractor._iter_chunks_safely(file_content, file_name, file_type), file_type
+
+    @staticmethod
+    def iter_chunks_from_file(file_path: str, file_name: str, content_type: str = "") -> Tuple[Iterator[Chunk], str]:
+        """
+        ローカルファイルからチャンクを読み進めながら順に返す
+        Returns: (chunk iterator, file_type)
+        """
+        file_type = TextExtractor.resolve_file_type(file_path, file_name, content_type)
+        return TextExtractor._iter_chunks_safely(file_path, file_name, file_type), file_type
+
+    @staticmethod
+    def cache_settings() -> str:
+        """抽出結果に影響するバージョン・設定（抽出キャッシュのキー用）"""
+        return (
+            f"v{TextExtractor.EXTRACTOR_VERSION}:{TextExtractor.MAX_CHUNK_SIZE}:{TextExtractor.MIN_CHUNK_SIZE}:"
+            f"{TextExtractor.OVERLAP_SIZE}:{TextExtractor.EXCEL_STREAMING}:{TextExtractor.EXCEL_ROW_WINDOW}"
+        )
+
+    @staticmethod
+    def detect_file_type(file_name: str, content_type: str = "") -> str:
+        """ファイル名・Content-Type から形式を判定"""
         file_name_lower = file_name.lower()
 
+        # PDF - ページごとに分割
+        if file_name_lower.endswith('.pdf') or 'pdf' in content_type:
+            return "PDF"
+        # PowerPoint - スライドごとに分割
+        elif file_name_lower.endswith(('.pptx', '.ppt')):
+            return "PowerPoint"
+        # Word - セクションごとに分割
+        elif file_name_lower.endswith(('.docx', '.doc')):
+            return "Word"
+        # Excel - シートごとに分割
+        elif file_name_lower.endswith(('.xlsx', '.xls')):
+            return "Excel"
+        # Text files - サイズで分割
+        elif file_name_lower.endswith(('.txt', '.md', '.csv', '.json', '.xml', '.html', '.css', '.js', '.py', '.java', '.c', '.cpp', '.ts', '.tsx')):
+            return "Text"
+        # Try to decode as text
+        elif 'text' in content_type:
+            return "Text"
+        # Unknown binary
+        return "Unknown"
+
+    @staticmethod
+    def sniff_format(source: Union[bytes, str]) -> str:
+        """先頭バイト（OOXMLはZIP内のパート名）から実際の形式を判定
+
+        Returns: "PDF" / "Word" / "Excel" / "PowerPoint" / "Text" / "LegacyOffice"（OLE形式の .doc/.xls/.ppt）/
+        "Zip"（OOXML以外のZIP）/ "Binary"
+        """
+        if isinstance(source, bytes):
+            head = source[:TextExtractor.SNIFF_BYTES]
+        else:
+            with open(source, "rb") as f:
+                head = f.read(TextExtractor.SNIFF_BYTES)
+
+        sniffed = TextExtractor.sniff_header(head)
+        if sniffed != "Zip":
+            return sniffed
+
         try:
-            # PDF - ページごとに分割
-            if file_name_lower.endswith('.pdf') or 'pdf' in content_type:
-                return TextExtractor._extract_pdf_chunks(file_content), "PDF"
+            with zipfile.ZipFile(TextExtractor._open_source(source)) as zf:
+                names = set(zf.namelist())
+        except zipfile.BadZipFile:
+            return "Binary"
+        for part, file_type in _OOXML_PARTS.items():
+            if part in names:
+                return file_type
+        return "Zip"
+
+    @staticmethod
+    def sniff_header(head: bytes) -> str:
+        """先頭バイトだけで形式を判定（ZIPは中身を見ずに "Zip" を返す）"""
+        if head.startswith(b"%PDF-"):
+            return "PDF"
+        if head.startswith(_OLE_SIGNATURE):
+            return "LegacyOffice"
+        if head.startswith(b"PK\x03\x04"):
+            return "Zip"
+        if TextExtractor._looks_like_text(head, complete=len(head) < TextExtractor.SNIFF_BYTES):
+            return "Text"
+        # PDFヘッダーの前に余分なバイトがあっても、先頭1024バイト以内にあれば読める
+        if b"%PDF-" in head[:1024]:
+            return "PDF"
+        return "Binary"
+
+    @staticmethod
+    def _looks_like_text(head: bytes, complete: bool) -> bool:
+        """BOM付き UTF-8 / UTF-16、または UTF-8 か Shift_JIS（cp932）としてデコードできればテキスト"""
+        if head.startswith((codecs.BOM_UTF8, codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+            return True
+        if b"\x00" in head:
+            return False
+        for encoding in ("utf-8", "cp932"):
+            try:
+                # 先頭だけ読んだ場合は末尾で途切れたマルチバイト文字を許容する
+                codecs.getincrementaldecoder(encoding)().decode(head, final=complete)
+                return True
+            except UnicodeDecodeError:
+                continue
+        return False
 
-            # PowerPoint - スライドごとに分割
-            elif file_name_lower.endswith(('.pptx', '.ppt')):
-                return TextExtractor._extract_pptx_chunks(file_content), "PowerPoint"
+    @staticmethod
+    def resolve_file_type(source: Union[bytes, str], file_name: str, content_type: str = "") -> str:
+        """抽出に使う形式（中身から判定し、対応していない形式は "Unknown"）"""
+        sniffed = TextExtractor.sniff_format(source)
+        return sniffed if sniffed in _SUPPORTED_TYPES else "Unknown"
 
-            # Word - セクションごとに分割
-            elif file_name_lower.endswith(('.docx', '.doc')):
-                return TextExtractor._extract_docx_chunks(file_content), "Word"
+    @staticmethod
+    def check_supported(source: Union[bytes, str], file_name: str, content_type: str = "") -> Optional[str]:
+        """取り込めないファイルなら理由を返す（取り込める場合は None）
 
-            # Excel - シートごとに分割
-            elif file_name_lower.endswith(('.xlsx', '.xls')):
-                return TextExtractor._extract_xlsx_chunks(file_content), "Excel"
+        中身が対応形式でない場合と、拡張子・Content-Type から想定される形式と中身が一致しない場合に拒否する。
+        """
+        return TextExtractor._rejection_reason(TextExtractor.sniff_format(source), file_name, content_type)
 
-            # Text files - サイズで分割
-            elif file_name_lower.endswith(('.txt', '.md', '.csv', '.json', '.xml', '.html', '.css', '.js', '.py', '.java', '.c', '.cpp', '.ts', '.tsx')):
-                text = file_content.decode('utf-8', errors='ignore')
-                return TextExtractor._split_text_to_chunks(text), "Text"
+    @staticmethod
+    def check_header(head: bytes, file_name: str, content_type: str = "") -> Optional[str]:
+        """先頭バイトだけで分かる範囲で check_supported と同じ判定をする（ファイル全体を読む前の早期拒否用）"""
+        sniffed = TextExtractor.sniff_header(head)
+        if sniffed == "Zip":
+            # OOXMLの種類はZIP全体を見ないと分からないため、Office形式を想定している場合は保留
+            declared = TextExtractor.detect_file_type(file_name, content_type)
+            if declared in ("Unknown", "Word", "Excel", "PowerPoint"):
+                return None
+        return TextExtractor._rejection_reason(sniffed, file_name, content_type)
 
-            # Try to decode as text
-            elif 'text' in content_type:
-                text = file_content.decode('utf-8', errors='ignore')
-                return TextExtractor._split_text_to_chunks(text), "Text"
+    @staticmethod
+    def _rejection_reason(sniffed: str, file_name: str, content_type: str) -> Optional[str]:
+        if sniffed == "LegacyOffice":
+            return "旧形式のOfficeファイル（.doc / .xls / .ppt）には対応していません。.docx / .xlsx / .pptx で保存し直してください"
+        if sniffed not in _SUPPORTED_TYPES:
+            return f"対応していないファイル形式です: {file_name}"
 
-            # Unknown binary
-            else:
-                return [Chunk(f"[対応していないファイル形式: {file_name}]", "unknown", "unknown")], "Unknown"
+        declared = TextExtractor.detect_file_type(file_name, content_type)
+        if declared != "Unknown" and declared != sniffed:
+            return f"ファイルの内容が拡張子・Content-Typeと一致しません（想定: {declared}, 内容: {sniffed}）: {file_name}"
+        return None
 
+    @staticmethod
+    def _extract_chunks_from_source(source: Union[bytes, str], file_name: str, content_type: str = "") -> Tuple[List[Chunk], str]:
+        """source は bytes またはファイルパス"""
+        try:
+            file_type = TextExtractor.resolve_file_type(source, file_name, content_type)
+            return list(TextExtractor._iter_chunks_from_source(source, file_name, file_type)), file_type
         except Exception as e:
             return [Chunk(f"[テキスト抽出エラー: {str(e)}]", "error", "error")], "Error"
 
     @staticmethod
-    def _extract_pdf_chunks(content: bytes) -> List[Chunk]:
-        """PDFからページごとにチャンク抽出"""
+    def _iter_chunks_safely(source: Union[bytes, str], file_name: str, file_type: str) -> Iterator[Chunk]:
+        """抽出途中で失敗した場合は、それまでのチャンクに続けてエラーチャンクを返す"""
+        try:
+            yield from TextExtractor._iter_chunks_from_source(source, file_name, file_type)
+        except Exception as e:
+            yield Chunk(f"[テキスト抽出エラー: {str(e)}]", "error", "error")
+
+    @staticmethod
+    def _iter_chunks_from_source(source: Union[bytes, str], file_name: str, file_type: str) -> Iterator[Chunk]:
+        if file_type == "PDF":
+            yield from TextExtractor._iter_pdf_chunks(source)
+        elif file_type == "PowerPoint":
+            yield from TextExtractor._iter_pptx_chunks(source)
+        elif file_type == "Word":
+            yield from TextExtractor._iter_docx_chunks(source)
+        elif file_type == "Excel":
+            yield from TextExtractor._iter_xlsx_chunks(source)
+        elif file_type == "Text":
+            yield from TextExtractor._iter_text_chunks(TextExtractor._decode_text(source))
+        else:
+            yield Chunk(f"[対応していないファイル形式: {file_name}]", "unknown", "unknown")
+
+    @staticmethod
+    def _open_source(source: Union[bytes, str]):
+        """ライブラリに渡す入力（bytes は BytesIO、ファイルパスはそのまま）"""
+        return io.BytesIO(source) if isinstance(source, bytes) else source
+
+    @staticmethod
+    def _read_ooxml_fast(reader, source: Union[bytes, str]):
+        """OOXMLのXMLを直接読む（OOXML_FAST_PATH）
+
+        想定外の構造で読めない場合やテキストが見つからない場合は None を返し、呼び出し側で
+        python-docx / python-pptx による従来の方法で読み直す。
+        """
+        if not TextExtractor.OOXML_FAST_PATH:
+            return None
+        try:
+            with zipfile.ZipFile(TextExtractor._open_source(source)) as zf:
+                result = reader(zf)
+        except (KeyError, ValueError, ET.ParseError, zipfile.BadZipFile):
+            return None
+        return result if any(result) else None
+
+    @staticmethod
+    def _iter_xml_children(stream, parent_tag: str) -> Iterator[ET.Element]:
+        """parent_tag の要素の直下の子要素を、終了タグまで読んだものから順に返す（返した要素は木から外して解放する）"""
+        stack = []
+        for event, elem in ET.iterparse(stream, events=("start", "end")):
+            if event == "start":
+                stack.append(elem)
+                continue
+            stack.pop()
+            if stack and stack[-1].tag == parent_tag:
+                yield elem
+                stack[-1].remove(elem)
+
+    @staticmethod
+    def _read_rels(zf: zipfile.ZipFile, part_name: str) -> dict:
+        """リレーションシップ（.rels）の Id → Target"""
+        root = ET.fromstring(zf.read(part_name))
+        return {rel.get("Id"): rel.get("Target") for rel in root.findall(f"{_PACKAGE_RELS}Relationship")}
+
+    @staticmethod
+    def _decode_text(source: Union[bytes, str]) -> str:
+        """テキストをデコード（ファイルパスの場合は mmap 経由で bytes のコピーを作らない）"""
+        if isinstance(source, bytes):
+            return TextExtractor._decode_bytes(source)
+
+        if os.path.getsize(source) == 0:
+            return ""
+        with open(source, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return TextExtractor._decode_bytes(mm)
+
+    @staticmethod
+    def _decode_bytes(data) -> str:
+        """文字コードを判定してデコード（BOM → UTF-8 → Shift_JIS(cp932)、いずれでもなければ置換文字で UTF-8）"""
+        head = bytes(data[:3])
+        if head.startswith(codecs.BOM_UTF8):
+            return str(data, "utf-8-sig")
+        if head.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+            return str(data, "utf-16")
+        for encoding in ("utf-8", "cp932"):
+            try:
+                return str(data, encoding)
+            except UnicodeDecodeError:
+                continue
+        return str(data, "utf-8", "replace")
+
+    @staticmethod
+    def _iter_pdf_chunks(source: Union[bytes, str]) -> Iterator[Chunk]:
+        """PDFからページごとにチャンク抽出（ページ数が多い場合は並列抽出）"""
         import fitz  # PyMuPDF
 
-        chunks = []
-        with fitz.open(stream=content, filetype="pdf") as doc:
+        found = False
+        if isinstance(source, bytes):
+            pdf = fitz.open(stream=source, filetype="pdf")
+        else:
+            pdf = fitz.open(source, filetype="pdf")
+        with pdf as doc:
             total_pages = len(doc)
-            for page_num, page in enumerate(doc, 1):
-                page_text = page.get_text().strip()
-                if page_text:
-                    # ページが長すぎる場合はさらに分割
-                    if len(page_text) > TextExtractor.MAX_CHUNK_SIZE:
-                        sub_chunks = TextExtractor._split_text_to_chunks(
-                            page_text,
-                            prefix=f"ページ {page_num}/{total_pages}"
-                        )
-                        for i, sub_chunk in enumerate(sub_chunks):
-                            chunks.append(Chunk(
-                                text=sub_chunk.text,
-                                chunk_id=f"page_{page_num}_part_{i+1}",
-                                chunk_type="page_section"
-                            ))
-                    else:
-                        chunks.append(Chunk(
-                            text=f"[ページ {page_num}/{total_pages}]\n\n{page_text}",
-                            chunk_id=f"page_{page_num}",
-                            chunk_type="page"
-                        ))
-
-        if not chunks:
-            chunks.append(Chunk("[PDFからテキストを抽出できませんでした]", "error", "error"))
+            parallel = TextExtractor._use_parallel_pdf(total_pages)
+            if not parallel:
+                for page_num, page in enumerate(doc, 1):
+                    for chunk in TextExtractor._pdf_page_chunks(page.get_text(), page_num, total_pages):
+                        found = True
+                        yield chunk
 
-        return chunks
+        if parallel:
+            for chunk in TextExtractor._iter_pdf_chunks_parallel(source, total_pages):
+                found = True
+                yield chunk
+
+        if not found:
+            yield Chunk("[PDFからテキストを抽出できませんでした]", "error", "error")
 
     @staticmethod
-    def _extract_pptx_chunks(content: bytes) -> List[Chunk]:
-        """PowerPointからスライドごとにチャンク抽出"""
-        from pptx import Presentation
+    def _use_parallel_pdf(total_pages: int) -> bool:
+        """並列抽出するか（ワーカープロセス内ではさらにプロセスを増やさない）"""
+        return (
+            TextExtractor.PDF_PARALLEL_PAGE_THRESHOLD > 0
+            and total_pages >= TextExtractor.PDF_PARALLEL_PAGE_THRESHOLD
+            and TextExtractor.PDF_PARALLEL_WORKERS > 1
+            and multiprocessing.parent_process() is None
+        )
+
+    @staticmethod
+    def _iter_pdf_chunks_parallel(source: Union[bytes, str], total_pages: int) -> Iterator[Chunk]:
+        """ページ範囲をプロセスプールに分配して抽出し、ページ順に返す
+
+        各ワーカーは同じファイルを開く（bytes の場合は一時ファイルに書き出して共有）。
+        """
+        temp_path = None
+        if isinstance(source, bytes):
+            fd, temp_path = tempfile.mkstemp(suffix=".pdf")
+            with os.fdopen(fd, "wb") as f:
+                f.write(source)
+            source = temp_path
+
+        try:
+            workers = min(TextExtractor.PDF_PARALLEL_WORKERS, total_pages)
+            # ワーカー数より細かく分けて、ページごとの重さの偏りを均す
+            range_size = max(1, -(-total_pages // (workers * 4)))
+            ranges = [(start, min(start + range_size, total_pages)) for start in range(0, total_pages, range_size)]
+
+            with ProcessPoolExecutor(max_workers=workers, mp_context=process_pool_context()) as pool:
+                futures = [
+                    pool.submit(TextExtractor._extract_pdf_page_range, source, start, end, total_pages)
+                    for start, end in ranges
+                ]
+                for future in futures:
+                    yield from future.result()
+        finally:
+            if temp_path:
+                os.remove(temp_path)
+
+    @staticmethod
+    def _extract_pdf_page_range(file_path: str, start: int, end: int, total_pages: int) -> List[Chunk]:
+        """ワーカープロセス: ページ範囲 [start, end) のチャンクを抽出"""
+        import fitz  # PyMuPDF
 
         chunks = []
-        prs = Presentation(io.BytesIO(content))
-        total_slides = len(prs.slides)
+        with fitz.open(file_path, filetype="pdf") as doc:
+            for index in range(start, end):
+                chunks.extend(TextExtractor._pdf_page_chunks(doc[index].get_text(), index + 1, total_pages))
+        return chunks
 
-        for slide_num, slide in enumerate(prs.slides, 1):
-            slide_texts = []
-            for shape in slide.shapes:
-                if hasattr(shape, "text") and shape.text.strip():
-                    slide_texts.append(shape.text.strip())
+    @staticmethod
+    def _pdf_page_chunks(page_text: str, page_num: int, total_pages: int) -> List[Union[Chunk, SpanChunk]]:
+        """1ページ分のチャンク（長すぎるページはさらに分割）"""
+        page_text = page_text.strip()
+        if not page_text:
+            return []
+
+        if len(page_text) <= TextExtractor.MAX_CHUNK_SIZE:
+            return [Chunk(
+                text=f"[ページ {page_num}/{total_pages}]\n\n{page_text}",
+                chunk_id=f"page_{page_num}",
+                chunk_type="page"
+            )]
+
+        sub_chunks = list(TextExtractor._iter_text_chunks(
+            page_text,
+            prefix=f"ページ {page_num}/{total_pages}"
+        ))
+        for i, sub_chunk in enumerate(sub_chunks):
+            sub_chunk.chunk_id = f"page_{page_num}_part_{i+1}"
+            sub_chunk.chunk_type = "page_section"
+        return sub_chunks
+
+    @staticmethod
+    def _iter_pptx_chunks(source: Union[bytes, str]) -> Iterator[Chunk]:
+        """PowerPointからスライドごとにチャンク抽出"""
+        slides = TextExtractor._read_ooxml_fast(TextExtractor._read_pptx_slides, source)
+        if slides is None:
+            slides = TextExtractor._read_pptx_slides_with_library(source)
+
+        found = False
+        total_slides = len(slides)
 
+        for slide_num, slide_texts in enumerate(slides, 1):
             if slide_texts:
+                found = True
                 slide_content = "\n".join(slide_texts)
-                chunks.append(Chunk(
+                yield Chunk(
                     text=f"[スライド {slide_num}/{total_slides}]\n\n{slide_content}",
                     chunk_id=f"slide_{slide_num}",
                     chunk_type="slide"
-                ))
+                )
 
-        if not chunks:
-            chunks.append(Chunk("[PowerPointからテキストを抽出できませんでした]", "error", "error"))
+        if not found:
+            yield Chunk("[PowerPointからテキストを抽出できませんでした]", "error", "error")
 
-        return chunks
+    @staticmethod
+    def _read_pptx_slides_with_library(source: Union[bytes, str]) -> List[List[str]]:
+        """python-pptx でスライドごとの図形テキストを読む"""
+        from pptx import Presentation
+
+        prs = Presentation(TextExtractor._open_source(source))
+        return [
+            [shape.text.strip() for shape in slide.shapes if hasattr(shape, "text") and shape.text.strip()]
+            for slide in prs.slides
+        ]
 
     @staticmethod
-    def _extract_docx_chunks(content: bytes) -> List[Chunk]:
-        """Wordからセクションごとにチャンク抽出"""
-        from docx import Document
+    def _read_pptx_slides(zf: zipfile.ZipFile) -> List[List[str]]:
+        """スライド順（presentation.xml の sldIdLst）に各スライドの図形テキストを読む（python-pptx と同じ規則）"""
+        rels = TextExtractor._read_rels(zf, "ppt/_rels/presentation.xml.rels")
+        slide_ids = ET.fromstring(zf.read("ppt/presentation.xml")).find(f"{_P}sldIdLst")
+
+        slides = []
+        for slide_id in (slide_ids if slide_ids is not None else []):
+            part_name = posixpath.normpath(posixpath.join("/ppt", rels[slide_id.get(f"{_R}id")])).lstrip("/")
+            with zf.open(part_name) as f:
+                # テキストを持つのは図形ツリー直下の p:sp だけ（グループ・表・画像は python-pptx でも対象外）
+                shape_texts = (
+                    TextExtractor._pptx_shape_text(shape)
+                    for shape in TextExtractor._iter_xml_children(f, f"{_P}spTree")
+                    if shape.tag == f"{_P}sp"
+                )
+                slides.append([text.strip() for text in shape_texts if text.strip()])
+        return slides
 
-        doc = Document(io.BytesIO(content))
+    @staticmethod
+    def _pptx_shape_text(shape: ET.Element) -> str:
+        """段落は改行、段落内の改行（a:br）は垂直タブで区切る"""
+        body = shape.find(f"{_P}txBody")
+        if body is None:
+            return ""
 
-        # 段落を収集
         paragraphs = []
+        for para in body.findall(f"{_A}p"):
+            parts = []
+            for elem in para:
+                if elem.tag == f"{_A}br":
+                    parts.append("\v")
+                elif elem.tag in (f"{_A}r", f"{_A}fld"):
+                    t = elem.find(f"{_A}t")
+                    parts.append((t.text or "") if t is not None else "")
+            paragraphs.append("".join(parts))
+        return "\n".join(paragraphs)
+
+    @staticmethod
+    def _iter_docx_blocks(doc) -> Iterator[str]:
+        """Wordの段落（本文の後に表）を順に返す"""
         for para in doc.paragraphs:
             if para.text.strip():
-                paragraphs.append(para.text.strip())
+                yield para.text.strip()
 
-        # テーブルも収集
         for table in doc.tables:
             table_text = []
             for row in table.rows:
@@ -146,228 +573,404 @@ class TextExtractor:
                 if row_text:
                     table_text.append(row_text)
             if table_text:
-                paragraphs.append("\n".join(table_text))
+                yield "\n".join(table_text)
 
-        if not paragraphs:
-            return [Chunk("[Wordからテキストを抽出できませんでした]", "error", "error")]
+    @staticmethod
+    def _read_docx_blocks(zf: zipfile.ZipFile) -> List[str]:
+        """word/document.xml を読み、_iter_docx_blocks と同じ段落・表のテキストを返す"""
+        paragraphs, tables = [], []
+        with zf.open("word/document.xml") as f:
+            for elem in TextExtractor._iter_xml_children(f, f"{_W}body"):
+                if elem.tag == f"{_W}p":
+                    text = TextExtractor._docx_paragraph_text(elem).strip()
+                    if text:
+                        paragraphs.append(text)
+                elif elem.tag == f"{_W}tbl":
+                    text = TextExtractor._docx_table_text(elem)
+                    if text:
+                        tables.append(text)
+        return paragraphs + tables
+
+    @staticmethod
+    def _docx_paragraph_text(para: ET.Element) -> str:
+        """段落直下とハイパーリンク内のランのテキスト（python-docx の Paragraph.text と同じ）"""
+        parts = []
+        for elem in para:
+            if elem.tag == f"{_W}r":
+                parts.append(TextExtractor._docx_run_text(elem))
+            elif elem.tag == f"{_W}hyperlink":
+                parts.extend(TextExtractor._docx_run_text(run) for run in elem.findall(f"{_W}r"))
+        return "".join(parts)
+
+    @staticmethod
+    def _docx_run_text(run: ET.Element) -> str:
+        parts = []
+        for elem in run:
+            tag = elem.tag
+            if tag == f"{_W}t":
+                parts.append(elem.text or "")
+            elif tag in (f"{_W}tab", f"{_W}ptab"):
+                parts.append("\t")
+            elif tag == f"{_W}cr":
+                parts.append("\n")
+            elif tag == f"{_W}br":
+                # 改ページ・段区切りは無視
+                if elem.get(f"{_W}type", "textWrapping") == "textWrapping":
+                    parts.append("\n")
+            elif tag == f"{_W}noBreakHyphen":
+                parts.append("-")
+        return "".join(parts)
+
+    @staticmethod
+    def _docx_table_text(table: ET.Element) -> str:
+        """表の各行を "セル | セル | ..." にする
+
+        python-docx の row.cells と同じく、横に結合したセル（gridSpan）は列数分繰り返し、
+        縦に結合したセル（vMerge）は上の行の同じ列のセルを使う。
+        """
+        rows_text = []
+        cells_above = {}
+        for row in table.findall(f"{_W}tr"):
+            grid_before = row.find(f"{_W}trPr/{_W}gridBefore")
+            offset = int(grid_before.get(f"{_W}val")) if grid_before is not None else 0
+
+            cells, row_cells = [], {}
+            for cell in row.findall(f"{_W}tc"):
+                grid_span = cell.find(f"{_W}tcPr/{_W}gridSpan")
+                span = int(grid_span.get(f"{_W}val")) if grid_span is not None else 1
+                v_merge = cell.find(f"{_W}tcPr/{_W}vMerge")
+                if v_merge is not None and v_merge.get(f"{_W}val", "continue") == "continue":
+                    if offset not in cells_above:
+                        raise ValueError(f"no cell above grid offset {offset}")
+                    texts = cells_above[offset]
+                else:
+                    text = "\n".join(TextExtractor._docx_paragraph_text(p) for p in cell.findall(f"{_W}p"))
+                    texts = [text] * span
+                row_cells[offset] = texts
+                cells.extend(texts)
+                offset += span
+
+            cells_above = row_cells
+            row_text = " | ".join(text.strip() for text in cells if text.strip())
+            if row_text:
+                rows_text.append(row_text)
+        return "\n".join(rows_text)
+
+    @staticmethod
+    def _iter_docx_chunks(source: Union[bytes, str]) -> Iterator[Chunk]:
+        """Wordからセクションごとにチャンク抽出"""
+        blocks = TextExtractor._read_ooxml_fast(TextExtractor._read_docx_blocks, source)
+        if blocks is None:
+            from docx import Document
+            blocks = TextExtractor._iter_docx_blocks(Document(TextExtractor._open_source(source)))
 
         # 段落をチャンクにまとめる
-        chunks = []
+        found = False
         current_text = ""
         chunk_num = 1
 
-        for para in paragraphs:
+        for para in blocks:
+            found = True
             if len(current_text) + len(para) > TextExtractor.MAX_CHUNK_SIZE:
                 if current_text:
-                    chunks.append(Chunk(
+                    yield Chunk(
                         text=f"[セクション {chunk_num}]\n\n{current_text}",
                         chunk_id=f"section_{chunk_num}",
                         chunk_type="section"
-                    ))
+                    )
                     chunk_num += 1
                 current_text = para
             else:
                 current_text += "\n\n" + para if current_text else para
 
+        if not found:
+            yield Chunk("[Wordからテキストを抽出できませんでした]", "error", "error")
+            return
+
         # 残りを追加
         if current_text:
-            chunks.append(Chunk(
+            yield Chunk(
                 text=f"[セクション {chunk_num}]\n\n{current_text}",
                 chunk_id=f"section_{chunk_num}",
                 chunk_type="section"
-            ))
-
-        return chunks
+            )
 
     @staticmethod
-    def _extract_xlsx_chunks(content: bytes) -> List[Chunk]:
+    def _iter_xlsx_chunks(source: Union[bytes, str]) -> Iterator[Union[Chunk, SpanChunk]]:
         """Excelからシートごとにチャンク抽出"""
         from openpyxl import load_workbook
 
-        wb = load_workbook(io.BytesIO(content), read_only=True, data_only=True)
-        chunks = []
+        wb = load_workbook(TextExtractor._open_source(source), read_only=True, data_only=True)
+        found = False
 
-        for sheet_name in wb.sheetnames:
-            sheet = wb[sheet_name]
-            rows_text = []
-
-            for row in sheet.iter_rows():
-                row_values = []
-                for cell in row:
-                    if cell.value is not None:
-                        row_values.append(str(cell.value))
-                if row_values:
-                    rows_text.append(" | ".join(row_values))
-
-            if rows_text:
-                sheet_content = "\n".join(rows_text)
-
-                # シートが長すぎる場合は分割
-                if len(sheet_content) > TextExtractor.MAX_CHUNK_SIZE:
-                    sub_chunks = TextExtractor._split_text_to_chunks(
-                        sheet_content,
-                        prefix=f"シート: {sheet_name}"
-                    )
-                    for i, sub_chunk in enumerate(sub_chunks):
-                        chunks.append(Chunk(
-                            text=sub_chunk.text,
-                            chunk_id=f"sheet_{sheet_name}_part_{i+1}",
-                            chunk_type="sheet_section"
-                        ))
+        try:
+            for sheet_name in wb.sheetnames:
+                rows = TextExtractor._iter_sheet_rows(wb[sheet_name])
+                if TextExtractor.EXCEL_STREAMING:
+                    sheet_chunks = TextExtractor._iter_sheet_row_windows(sheet_name, rows)
                 else:
-                    chunks.append(Chunk(
-                        text=f"[シート: {sheet_name}]\n\n{sheet_content}",
-                        chunk_id=f"sheet_{sheet_name}",
-                        chunk_type="sheet"
-                    ))
+                    sheet_chunks = TextExtractor._iter_sheet_chunks(sheet_name, rows)
+                for chunk in sheet_chunks:
+                    found = True
+                    yield chunk
+        finally:
+            wb.close()
 
-        wb.close()
+        if not found:
+            yield Chunk("[Excelからテキストを抽出できませんでした]", "error", "error")
 
-        if not chunks:
-            chunks.append(Chunk("[Excelからテキストを抽出できませんでした]", "error", "error"))
+    @staticmethod
+    def _iter_sheet_rows(sheet) -> Iterator[Tuple[int, str]]:
+        """空でない行を (行番号, "値 | 値 | ...") で順に返す"""
+        for row_num, values in enumerate(sheet.iter_rows(values_only=True), 1):
+            row_values = [str(value) for value in values if value is not None]
+            if row_values:
+                yield row_num, " | ".join(row_values)
 
-        return chunks
+    @staticmethod
+    def _iter_sheet_chunks(sheet_name: str, rows: Iterator[Tuple[int, str]]) -> Iterator[Union[Chunk, SpanChunk]]:
+        """シート全体を1つのテキストにしてから分割（EXCEL_STREAMING=false の場合）"""
+        rows_text = [row_text for _, row_text in rows]
+        if not rows_text:
+            return
+
+        sheet_content = "\n".join(rows_text)
+
+        # シートが長すぎる場合は分割
+        if len(sheet_content) > TextExtractor.MAX_CHUNK_SIZE:
+            sub_chunks = TextExtractor._iter_text_chunks(
+                sheet_content,
+                prefix=f"シート: {sheet_name}"
+            )
+            for i, sub_chunk in enumerate(sub_chunks):
+                sub_chunk.chunk_id = f"sheet_{sheet_name}_part_{i+1}"
+                sub_chunk.chunk_type = "sheet_section"
+                yield sub_chunk
+        else:
+            yield Chunk(
+                text=f"[シート: {sheet_name}]\n\n{sheet_content}",
+                chunk_id=f"sheet_{sheet_name}",
+                chunk_type="sheet"
+            )
+
+    @staticmethod
+    def _iter_sheet_row_windows(sheet_name: str, rows: Iterator[Tuple[int, str]]) -> Iterator[Union[Chunk, SpanChunk]]:
+        """行を読みながらウィンドウ単位でチャンク化（保持するのは見出し行と1ウィンドウ分の行だけ）
+
+        最初の空でない行を見出し行として各チャンクの先頭に付ける（長い見出し行は EXCEL_HEADER_MAX_CHARS 文字で
+        切り詰める）。ウィンドウは見出し行を含めて MAX_CHUNK_SIZE 文字・EXCEL_ROW_WINDOW 行まで。
+        見出し行と合わせて MAX_CHUNK_SIZE を超える行は、単独でテキストとして分割する。
+        シート全体が1ウィンドウに収まる場合は従来どおり1チャンク（sheet_{シート名}）にする。
+        """
+        max_size = TextExtractor.MAX_CHUNK_SIZE
+        header: Optional[str] = None
+        window: List[Tuple[int, str]] = []
+        window_size = 0  # 見出し行を含むウィンドウの文字数
+        flushed = False
+
+        for row_num, row_text in rows:
+            if header is None:
+                header_limit = TextExtractor.EXCEL_HEADER_MAX_CHARS
+                if len(row_text) > header_limit:
+                    # 見出し行の全文は単独で分割し、各チャンクには切り詰めたものを付ける
+                    yield from TextExtractor._long_row_chunks(sheet_name, row_num, row_text)
+                    flushed = True
+                    header = row_text[:header_limit] + "…"
+                else:
+                    header = row_text
+                window_size = len(header)
+                continue
+
+            if len(header) + 1 + len(row_text) > max_size:
+                if window:
+                    yield TextExtractor._row_window_chunk(sheet_name, header, window)
+                    window, window_size = [], len(header)
+                yield from TextExtractor._long_row_chunks(sheet_name, row_num, row_text)
+                flushed = True
+                continue
+
+            if window and (window_size + 1 + len(row_text) > max_size
+                           or len(window) >= TextExtractor.EXCEL_ROW_WINDOW):
+                yield TextExtractor._row_window_chunk(sheet_name, header, window)
+                flushed = True
+                window, window_size = [], len(header)
+
+            window.append((row_num, row_text))
+            window_size += 1 + len(row_text)
+
+        if header is None:
+            return
+
+        if not flushed:
+            sheet_content = "\n".join([header] + [row_text for _, row_text in window])
+            yield Chunk(
+                text=f"[シート: {sheet_name}]\n\n{sheet_content}",
+                chunk_id=f"sheet_{sheet_name}",
+                chunk_type="sheet"
+            )
+        elif window:
+            yield TextExtractor._row_window_chunk(sheet_name, header, window)
+
+    @staticmethod
+    def _long_row_chunks(sheet_name: str, row_num: int, row_text: str) -> Iterator[Union[Chunk, SpanChunk]]:
+        """1行だけで MAX_CHUNK_SIZE を超える行をテキストとして分割"""
+        sub_chunks = TextExtractor._iter_text_chunks(row_text, prefix=f"シート: {sheet_name} 行 {row_num}")
+        for i, sub_chunk in enumerate(sub_chunks):
+            sub_chunk.chunk_id = f"sheet_{sheet_name}_row_{row_num}_part_{i+1}"
+            sub_chunk.chunk_type = "sheet_section"
+            yield sub_chunk
+
+    @staticmethod
+    def _row_window_chunk(sheet_name: str, header: str, window: List[Tuple[int, str]]) -> Chunk:
+        first_row, last_row = window[0][0], window[-1][0]
+        content = "\n".join([header] + [row_text for _, row_text in window])
+        return Chunk(
+            text=f"[シート: {sheet_name} 行 {first_row}-{last_row}]\n\n{content}",
+            chunk_id=f"sheet_{sheet_name}_rows_{first_row}_{last_row}",
+            chunk_type="sheet_rows"
+        )
 
     @staticmethod
     def _split_into_sentences(text: str) -> List[str]:
         """テキストを文単位で分割"""
-        import re
         # 日本語と英語の文末を考慮
         # 。！？.!? の後にスペースや改行がある場合、または文末の場合に分割
-        sentences = re.split(r'(?<=[。！？.!?])\s*', text)
-        return [s.strip() for s in sentences if s.strip()]
+        return [s for s in map(str.strip, _SENTENCE_BOUNDARY.split(text)) if s]
 
     @staticmethod
     def _split_by_topic(text: str) -> List[str]:
         """テキストをトピック（セクション/改行/見出し）単位で分割"""
-        import re
+        return list(TextExtractor._iter_topics(text))
 
-        # 優先度1: 見出しパターンで分割（■、●、【】、#、数字. など）
-        # 優先度2: 空行（2連続改行）で分割
-        # 優先度3: 単一改行で分割
-
-        # 見出しパターン
-        heading_pattern = r'\n(?=(?:■|●|◆|▼|【|#|[0-9０-９]+[.．、)）]|\d+\.\s))'
-
-        # まず見出しで分割
-        sections = re.split(heading_pattern, text)
+    @staticmethod
+    def _iter_topics(text: str) -> Iterator[str]:
+        """トピックを順に返す
 
-        result = []
-        for section in sections:
+        優先度1: 見出しパターンで分割（■、●、【】、#、数字. など）
+        優先度2: 空行（2連続改行）で分割
+        優先度3: 単一改行で分割
+        """
+        max_size = TextExtractor.MAX_CHUNK_SIZE
+        for section in _HEADING_BOUNDARY.split(text):
             section = section.strip()
             if not section:
                 continue
 
-            # セクションが大きすぎる場合は空行で分割
-            if len(section) > TextExtractor.MAX_CHUNK_SIZE:
-                paragraphs = section.split('\n\n')
-                for para in paragraphs:
-                    para = para.strip()
-                    if not para:
-                        continue
-                    # まだ大きすぎる場合は単一改行で分割
-                    if len(para) > TextExtractor.MAX_CHUNK_SIZE:
-                        lines = para.split('\n')
-                        for line in lines:
-                            line = line.strip()
-                            if line:
-                                result.append(line)
-                    else:
-                        result.append(para)
-            else:
-                result.append(section)
+            if len(section) <= max_size:
+                yield section
+                continue
 
-        return result
+            # セクションが大きすぎる場合は空行で分割
+            for para in section.split('\n\n'):
+                para = para.strip()
+                if not para:
+                    continue
+                # まだ大きすぎる場合は単一改行で分割
+                if len(para) > max_size:
+                    for line in para.split('\n'):
+                        line = line.strip()
+                        if line:
+                            yield line
+                else:
+                    yield para
 
     @staticmethod
-    def _split_text_to_chunks(text: str, prefix: str = "") -> List[Chunk]:
+    def _split_text_to_chunks(text: str, prefix: str = "") -> List[Union[Chunk, SpanChunk]]:
         """テキストをトピック単位で分割（セマンティック検索最適化）"""
+        return list(TextExtractor._iter_text_chunks(text, prefix))
+
+    @staticmethod
+    def _make_chunk(text: str, start: int, body: str, chunk_id: str, chunk_type: str,
+                    header: str = "", overlap: str = "") -> Union[Chunk, SpanChunk]:
+        """本文が text[start:] から連続していれば区間（SpanChunk）で、そうでなければ Chunk で作る"""
+        if text.startswith(body, start):
+            return SpanChunk(text, start, start + len(body), chunk_id, chunk_type, header, overlap)
+        return Chunk(text=f"{header}{overlap}{body}", chunk_id=chunk_id, chunk_type=chunk_type)
+
+    @staticmethod
+    def _iter_text_chunks(text: str, prefix: str = "") -> Iterator[Union[Chunk, SpanChunk]]:
+        """テキストをトピック単位で分割しながら順に返す
+
+        トピック（大きすぎるものは文）を1回の走査で詰めていく。収まるかどうかは長さだけで判定し、
+        収まる場合のみ現在のチャンクに追記する。本文が元テキストの連続した部分であるチャンク
+        （段落・文の区切りが元テキストと同じ場合）は、コピーせずに元テキスト上の区間として持つ。
+        末尾の短い残りは直前のチャンクに結合するため、直前のチャンクを1つだけ保留してから返す。
+        """
+        max_size = TextExtractor.MAX_CHUNK_SIZE
+        overlap_size = TextExtractor.OVERLAP_SIZE
 
         # 短いテキストはそのまま返す
-        if len(text) <= TextExtractor.MAX_CHUNK_SIZE:
+        if len(text) <= max_size:
             header = f"[{prefix}]\n\n" if prefix else ""
-            return [Chunk(text=f"{header}{text}", chunk_id="chunk_1", chunk_type="text")]
+            yield SpanChunk(text, 0, len(text), "chunk_1", "text", header=header)
+            return
 
-        chunks = []
+        pending: Optional[Union[Chunk, SpanChunk]] = None
         chunk_num = 1
-
-        # トピック単位で分割
-        topics = TextExtractor._split_by_topic(text)
-
         current_chunk = ""
+        # 現在のチャンクの元テキスト上の開始位置（推定。区間として持つ前に一致を確認する）
+        chunk_start = 0
         overlap_text = ""
 
-        for topic in topics:
-            # トピックがまだ大きすぎる場合は文単位で分割
-            if len(topic) > TextExtractor.MAX_CHUNK_SIZE:
-                sentences = TextExtractor._split_into_sentences(topic)
-
-                for sentence in sentences:
-                    test_text = current_chunk + (" " if current_chunk else "") + sentence
-
-                    if len(test_text) > TextExtractor.MAX_CHUNK_SIZE and current_chunk:
-                        header = f"[{prefix} - {chunk_num}]\n\n" if prefix else ""
-                        full_text = overlap_text + current_chunk if overlap_text else current_chunk
-                        chunks.append(Chunk(
-                            text=f"{header}{full_text}",
-                            chunk_id=f"chunk_{chunk_num}",
-                            chunk_type="topic"
-                        ))
-
-                        overlap_text = current_chunk[-TextExtractor.OVERLAP_SIZE:] if len(current_chunk) > TextExtractor.OVERLAP_SIZE else current_chunk
-                        overlap_text = "..." + overlap_text + " "
-
-                        chunk_num += 1
-                        current_chunk = sentence
-                    else:
-                        current_chunk = test_text
+        for topic in TextExtractor._iter_topics(text):
+            # トピックがまだ大きすぎる場合は文単位、それ以外はトピックをそのまま詰める
+            if len(topic) > max_size:
+                pieces, separator = TextExtractor._split_into_sentences(topic), " "
             else:
-                # トピックをそのままチャンクとして追加（理想的なケース）
-                test_text = current_chunk + ("\n\n" if current_chunk else "") + topic
-
-                if len(test_text) > TextExtractor.MAX_CHUNK_SIZE and current_chunk:
+                pieces, separator = (topic,), "\n\n"
+            limit = max_size - len(separator)
+
+            for piece in pieces:
+                if not current_chunk:
+                    current_chunk = piece
+                    chunk_start = max(text.find(piece), 0)
+                elif len(current_chunk) + len(piece) <= limit:
+                    # 長さを先に判定し、収まる場合だけ末尾に追記する（試し連結の文字列を作らない）
+                    current_chunk += separator
+                    current_chunk += piece
+                else:
                     # 現在のチャンクを保存
-                    header = f"[{prefix} - {chunk_num}]\n\n" if prefix else ""
-                    full_text = overlap_text + current_chunk if overlap_text else current_chunk
-                    chunks.append(Chunk(
-                        text=f"{header}{full_text}",
-                        chunk_id=f"chunk_{chunk_num}",
-                        chunk_type="topic"
-                    ))
+                    if pending:
+                        yield pending
+                    pending = TextExtractor._make_chunk(
+                        text, chunk_start, current_chunk, f"chunk_{chunk_num}", "topic",
+                        header=f"[{prefix} - {chunk_num}]\n\n" if prefix else "",
+                        overlap=overlap_text
+                    )
 
-                    overlap_text = current_chunk[-TextExtractor.OVERLAP_SIZE:] if len(current_chunk) > TextExtractor.OVERLAP_SIZE else current_chunk
-                    overlap_text = "..." + overlap_text + " "
+                    overlap_text = "..." + current_chunk[-overlap_size:] + " "
 
+                    # 次のチャンクの先頭は、直前のチャンクの後ろ（位置が分からない場合は先頭の次）から探す
+                    search_from = pending.end if isinstance(pending, SpanChunk) else chunk_start + 1
                     chunk_num += 1
-                    current_chunk = topic
-                else:
-                    current_chunk = test_text
+                    current_chunk = piece
+                    chunk_start = max(text.find(piece, search_from), 0)
 
         # 残りのテキストを追加
         if current_chunk and len(current_chunk) >= TextExtractor.MIN_CHUNK_SIZE:
-            header = f"[{prefix} - {chunk_num}]\n\n" if prefix else ""
-            full_text = overlap_text + current_chunk if overlap_text else current_chunk
-            chunks.append(Chunk(
-                text=f"{header}{full_text}",
-                chunk_id=f"chunk_{chunk_num}",
-                chunk_type="topic"
-            ))
-        elif current_chunk and chunks:
-            last_chunk = chunks[-1]
-            chunks[-1] = Chunk(
-                text=last_chunk.text + "\n\n" + current_chunk,
-                chunk_id=last_chunk.chunk_id,
-                chunk_type=last_chunk.chunk_type
+            if pending:
+                yield pending
+            yield TextExtractor._make_chunk(
+                text, chunk_start, current_chunk, f"chunk_{chunk_num}", "topic",
+                header=f"[{prefix} - {chunk_num}]\n\n" if prefix else "",
+                overlap=overlap_text
+            )
+        elif current_chunk and isinstance(pending, SpanChunk):
+            pending.append("\n\n", current_chunk)
+            yield pending
+        elif current_chunk and pending:
+            yield Chunk(
+                text=pending.text + "\n\n" + current_chunk,
+                chunk_id=pending.chunk_id,
+                chunk_type=pending.chunk_type
             )
         elif current_chunk:
-            header = f"[{prefix}]\n\n" if prefix else ""
-            chunks.append(Chunk(
-                text=f"{header}{current_chunk}",
-                chunk_id="chunk_1",
-                chunk_type="topic"
-            ))
-
-        return chunks
+            yield TextExtractor._make_chunk(
+                text, chunk_start, current_chunk, "chunk_1", "topic",
+                header=f"[{prefix}]\n\n" if prefix else ""
+            )
+        elif pending:
+            yield pending
 
     @staticmethod
     def extract(file_content: bytes, file_name: str, content_type: str = "") -> Tuple[str, str]:
@@ -0,0 +1,171 @@
+import os
+import hashlib
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import List, Optional
+
+from .extractor_service import Chunk
+
+
+def chunk_document_id(file_name: str, chunk_id: str, text: str) -> str:
+    """インデックス上のドキュメントID（ファイル名・チャンクID・内容ハッシュから決定的に生成）
+
+    同じ内容を再取り込みしても同じIDになるため、merge_or_upload で上書きされ重複しない。
+    """
+    content_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    key = f"{file_name}\x00{chunk_id}\x00{content_hash}"
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class EnrichedChunk:
+    """AIでタイトル・カテゴリ・埋め込みを付与したチャンク"""
+    chunk: Chunk
+    title: str
+    category: str
+    embedding: Optional[List[float]] = None
+    error: Optional[str] = None
+
+
+class IngestService:
+    """チャンクのエンリッチ（タイトル・カテゴリ・埋め込み）とインデックス登録を行うサービス
+
+    タイトル・カテゴリ生成（enrich_chunk）と埋め込み生成は互いに独立しているため、
+    プロセス共通のワーカープールで並列に実行する（同時実行数は MAX_CONCURRENCY で制限）。
+    """
+
+    MAX_CONCURRENCY = int(os.getenv("INGEST_MAX_CONCURRENCY", "8"))
+
+    def __init__(self, openai_service, search_service, manifest=None, max_concurrency: Optional[int] = None):
+        self.openai_service = openai_service
+        self.search_service = search_service
+        self.manifest = manifest
+        self.max_concurrency = max_concurrency or self.MAX_CONCURRENCY
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_concurrency,
+            thread_name_prefix="ingest"
+        )
+
+    def _submit(self, fn, *args):
+        """呼び出し元のコンテキスト（リクエストの期限など）を引き継いでワーカープールに投入"""
+        return self._executor.submit(contextvars.copy_context().run, fn, *args)
+
+    def enrich_chunks(self, file_name: str, chunks: List[Chunk]) -> List[EnrichedChunk]:
+        """全チャンクのエンリッチを並列実行し、入力と同じ順序で結果を返す"""
+        # 埋め込みはバッチ単位、タイトル・カテゴリはチャンク単位（1回の呼び出し）でワーカープールに投入
+        batches = self.openai_service.batch_embedding_inputs([chunk.text for chunk in chunks])
+        embedding_futures = [
+            self._submit(self.openai_service.generate_embeddings, batch)
+            for batch in batches
+        ]
+        enrichment_futures = [
+            self._submit(self._enrich, file_name, chunk)
+            for chunk in chunks
+        ]
+
+        embeddings: List[Optional[List[float]]] = []
+        errors: List[Optional[str]] = []
+        for future, batch in zip(embedding_futures, batches):
+            try:
+                embeddings.extend(future.result())
+                errors.extend([None] * len(batch))
+            except Exception as e:
+                embeddings.extend([None] * len(batch))
+                errors.extend([str(e)] * len(batch))
+
+        results = []
+        for chunk, enrichment_future, embedding, error in zip(chunks, enrichment_futures, embeddings, errors):
+            enrichment = enrichment_future.result()
+            results.append(EnrichedChunk(
+                chunk=chunk,
+                title=enrichment["title"],
+                category=enrichment["category"],
+                embedding=embedding,
+                error=error
+            ))
+
+        return results
+
+    def index_chunks(self, file_name: str, chunks: List[Chunk]) -> List[dict]:
+        """チャンクをエンリッチしてインデックスにバッチ登録し、チャンクごとの結果を返す"""
+        enriched = self.enrich_chunks(file_name, chunks)
+
+        # 埋め込みに成功したチャンクをまとめてインデックスに登録（バッチ単位で書き込み）
+        docs = []
+        doc_ids = []
+        for item in enriched:
+            doc_id = chunk_document_id(file_name, item.chunk.chunk_id, item.chunk.text)
+            doc_ids.append(doc_id)
+            if item.error is None:
+                docs.append({
+                    "doc_id": doc_id,
+                    "title": item.title,
+                    "content": item.chunk.text,
+                    "file_name": file_name,
+                    "embedding": item.embedding,
+                    "category": item.category
+                })
+
+        errors = {}
+        if docs:
+            try:
+                index_result = self.search_service.index_documents(docs)
+                errors = {f["id"]: f["error"] for f in index_result["failed"]}
+            except Exception as e:
+                errors = {doc["doc_id"]: str(e) for doc in docs}
+
+        chunk_results = []
+        for item, doc_id in zip(enriched, doc_ids):
+            chunk = item.chunk
+            error = item.error or errors.get(doc_id)
+            if error is None:
+                chunk_results.append({
+                    "chunk_id": chunk.chunk_id,
+                    "id": doc_id,
+                    "status": "indexed",
+                    "chars": len(chunk.text),
+                    "title": item.title,
+                    "category": item.category
+                })
+                print(f"  [OK] {chunk.chunk_id}: {len(chunk.text)} chars | {item.title} | {item.category}")
+            else:
+                chunk_results.append({
+                    "chunk_id": chunk.chunk_id,
+                    "id": doc_id,
+                    "status": "error",
+                    "error": error
+                })
+                print(f"  [WARN] {chunk.chunk_id}: {error}")
+
+        return chunk_results
+
+    def record_file(self, file_name: str, chunk_results: List[dict], content_hash: Optional[str],
+                    etag: Optional[str] = None, last_modified: Optional[str] = None) -> int:
+        """ファイルの取り込み結果をマニフェストに記録し、今回登録しなかった旧チャンクをインデックスから削除
+
+        失敗したチャンクがある場合は ETag・ハッシュを空にして、次回の再インデックスで再処理させる。
+        失敗したチャンクも今回のチャンクなので削除しない（前回の取り込みで登録済みの同じ内容を残す）。
+        Returns: 削除した旧チャンク数
+        """
+        chunk_ids = [r["id"] for r in chunk_results if r["status"] == "indexed"]
+        current_ids = [r["id"] for r in chunk_results]
+        try:
+            deleted = self.search_service.delete_stale_chunks(file_name, current_ids)["deleted"]
+        except Exception as e:
+            print(f"  [WARN] {file_name}: failed to remove stale chunks: {e}")
+            deleted = 0
+
+        if self.manifest:
+            if len(chunk_ids) < len(chunk_results):
+                etag, last_modified, content_hash = None, None, None
+            self.manifest.upsert(file_name, etag, last_modified, content_hash, chunk_ids)
+        return deleted
+
+    def _enrich(self, file_name: str, chunk: Chunk) -> dict:
+        """AIでタイトルとカテゴリを生成（失敗時はファイル名とチャンクID、「その他」を使用）"""
+        try:
+            return self.openai_service.enrich_chunk(chunk.text, file_name, chunk.chunk_id)
+        except Exception as e:
+            print(f"[WARN] Enrichment failed for {file_name} {chunk.chunk_id}, using fallback: {e}")
+            return {"title": f"{file_name} - {chunk.chunk_id}", "category": "その他"}
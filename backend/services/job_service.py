@@ -0,0 +1,485 @@
+import os
+import json
+import sqlite3
+import tempfile
+import threading
+import uuid
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone, timedelta
+from typing import Callable, List, Optional, Dict, Any
+
+from azure.core import MatchConditions
+from azure.core.exceptions import ResourceExistsError, ResourceModifiedError, ResourceNotFoundError
+from azure.storage.blob import BlobServiceClient
+
+from .resilience import resilient_call, is_transient_azure_error
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _with_progress(job: Dict[str, Any]) -> Dict[str, Any]:
+    """処理済みチャンク数の割合を progress として付ける"""
+    total = job["total_chunks"] or 0
+    job["progress"] = round(job["processed_chunks"] / total, 3) if total else 0.0
+    return job
+
+
+class JobStore(ABC):
+    """取り込みジョブの保存先のインターフェース
+
+    ジョブは queued → running → completed / failed と遷移する。チャンクは抽出順の連番（seq）で管理し、
+    pending で登録してから処理結果で更新する。
+    実行中のまま STALE_SECONDS 以上更新されていないジョブは、停止したプロセス・インスタンスのものとみなして再実行する。
+    """
+
+    STALE_SECONDS = float(os.getenv("INGEST_JOB_STALE_SECONDS", "900"))
+
+    @abstractmethod
+    def enqueue(self, file_name: str, content_type: str = "") -> Dict[str, Any]:
+        """ジョブを待機中（queued）で登録して返す"""
+
+    @abstractmethod
+    def claim_next(self) -> Optional[Dict[str, Any]]:
+        """最も古い待機中ジョブを実行中にして返す（なければ None）"""
+
+    @abstractmethod
+    def recover_interrupted(self):
+        """ワーカー起動時に、中断されたジョブを再実行できる状態に戻す"""
+
+    @abstractmethod
+    def set_chunks(self, job_id: str, file_type: str, chunk_ids: List[str]):
+        """抽出したチャンクを pending 状態で登録（登録済みのチャンクと進捗は消す）"""
+
+    @abstractmethod
+    def add_chunks(self, job_id: str, start_seq: int, chunk_ids: List[str]):
+        """抽出を進めながら見つかったチャンクを pending 状態で追加（総チャンク数も増やす）"""
+
+    @abstractmethod
+    def record_chunk_results(self, job_id: str, start_seq: int, chunk_results: List[dict]):
+        """チャンクごとの処理結果を保存して進捗を更新"""
+
+    @abstractmethod
+    def complete(self, job_id: str):
+        """ジョブを完了にする"""
+
+    @abstractmethod
+    def fail(self, job_id: str, error: str):
+        """ジョブを失敗にしてエラーを記録"""
+
+    @abstractmethod
+    def get_job(self, job_id: str, include_chunks: bool = True) -> Optional[Dict[str, Any]]:
+        """ジョブの状態・進捗（とチャンクごとの状態）を取得（なければ None）"""
+
+
+class SQLiteJobStore(JobStore):
+    """SQLite に保存するジョブストア（プロセス・インスタンスごとのファイル）
+
+    Azureなしでもローカルで動作確認できる。複数インスタンスにスケールアウトする場合は
+    インスタンス間でジョブが共有されないため BlobJobStore を使う。
+    """
+
+    DB_PATH = os.getenv("INGEST_JOB_DB_PATH", os.path.join(tempfile.gettempdir(), "ingest_jobs.db"))
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or self.DB_PATH
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._init_schema()
+
+    def _init_schema(self):
+        with self._lock, self._conn:
+            self._conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    job_id TEXT PRIMARY KEY,
+                    file_name TEXT NOT NULL,
+                    content_type TEXT,
+                    status TEXT NOT NULL,
+                    file_type TEXT,
+                    total_chunks INTEGER DEFAULT 0,
+                    processed_chunks INTEGER DEFAULT 0,
+                    indexed_chunks INTEGER DEFAULT 0,
+                    error TEXT,
+                    created_at TEXT NOT NULL,
+                    updated_at TEXT NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS job_chunks (
+                    job_id TEXT NOT NULL,
+                    seq INTEGER NOT NULL,
+                    chunk_id TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    chars INTEGER,
+                    title TEXT,
+                    category TEXT,
+                    error TEXT,
+                    PRIMARY KEY (job_id, seq)
+                );
+                CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, created_at);
+                """
+            )
+
+    def enqueue(self, file_name: str, content_type: str = "") -> Dict[str, Any]:
+        job_id = str(uuid.uuid4())
+        now = _now()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO jobs (job_id, file_name, content_type, status, created_at, updated_at) VALUES (?, ?, ?, 'queued', ?, ?)",
+                (job_id, file_name, content_type, now, now)
+            )
+        return self.get_job(job_id, include_chunks=False)
+
+    def _stale_before(self) -> str:
+        """これより前に更新された実行中のジョブは中断されたものとみなす（updated_at と同じ形式）"""
+        return (datetime.now(timezone.utc) - timedelta(seconds=self.STALE_SECONDS)).isoformat()
+
+    def claim_next(self) -> Optional[Dict[str, Any]]:
+        with self._lock, self._conn:
+            # 同じDBを共有する別のプロセスと同じジョブを取らないよう、書き込みロックを取ってから選ぶ。
+            # 停止したプロセスが実行中のまま残したジョブも取り直す
+            self._conn.execute("BEGIN IMMEDIATE")
+            row = self._conn.execute(
+                "SELECT job_id FROM jobs WHERE status = 'queued' OR (status = 'running' AND updated_at < ?) ORDER BY created_at LIMIT 1",
+                (self._stale_before(),)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE jobs SET status = 'running', updated_at = ? WHERE job_id = ?",
+                (_now(), row["job_id"])
+            )
+        return self.get_job(row["job_id"], include_chunks=False)
+
+    def set_chunks(self, job_id: str, file_type: str, chunk_ids: List[str]):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM job_chunks WHERE job_id = ?", (job_id,))
+            self._conn.executemany(
+                "INSERT INTO job_chunks (job_id, seq, chunk_id, status) VALUES (?, ?, ?, 'pending')",
+                [(job_id, seq, chunk_id) for seq, chunk_id in enumerate(chunk_ids)]
+            )
+            self._conn.execute(
+                "UPDATE jobs SET file_type = ?, total_chunks = ?, processed_chunks = 0, indexed_chunks = 0, updated_at = ? WHERE job_id = ?",
+                (file_type, len(chunk_ids), _now(), job_id)
+            )
+
+    def add_chunks(self, job_id: str, start_seq: int, chunk_ids: List[str]):
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO job_chunks (job_id, seq, chunk_id, status) VALUES (?, ?, ?, 'pending')",
+                [(job_id, start_seq + i, chunk_id) for i, chunk_id in enumerate(chunk_ids)]
+            )
+            self._conn.execute(
+                "UPDATE jobs SET total_chunks = total_chunks + ?, updated_at = ? WHERE job_id = ?",
+                (len(chunk_ids), _now(), job_id)
+            )
+
+    def record_chunk_results(self, job_id: str, start_seq: int, chunk_results: List[dict]):
+        indexed = sum(1 for r in chunk_results if r["status"] == "indexed")
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "UPDATE job_chunks SET status = ?, chars = ?, title = ?, category = ?, error = ? WHERE job_id = ? AND seq = ?",
+                [
+                    (r["status"], r.get("chars"), r.get("title"), r.get("category"), r.get("error"), job_id, start_seq + i)
+                    for i, r in enumerate(chunk_results)
+                ]
+            )
+            self._conn.execute(
+                "UPDATE jobs SET processed_chunks = processed_chunks + ?, indexed_chunks = indexed_chunks + ?, updated_at = ? WHERE job_id = ?",
+                (len(chunk_results), indexed, _now(), job_id)
+            )
+
+    def complete(self, job_id: str):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET status = 'completed', updated_at = ? WHERE job_id = ?",
+                (_now(), job_id)
+            )
+
+    def fail(self, job_id: str, error: str):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET status = 'failed', error = ?, updated_at = ? WHERE job_id = ?",
+                (error, _now(), job_id)
+            )
+
+    def get_job(self, job_id: str, include_chunks: bool = True) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+            if row is None:
+                return None
+            job = _with_progress(dict(row))
+
+            if include_chunks:
+                chunk_rows = self._conn.execute(
+                    "SELECT chunk_id, status, chars, title, category, error FROM job_chunks WHERE job_id = ? ORDER BY seq",
+                    (job_id,)
+                ).fetchall()
+                job["chunks"] = [
+                    {key: value for key, value in dict(r).items() if value is not None}
+                    for r in chunk_rows
+                ]
+        return job
+
+    def recover_interrupted(self):
+        """実行中のまま STALE_SECONDS 以上更新されていないジョブを待機中に戻す
+
+        同じDBを共有する別のワーカープロセスが処理中のジョブ（更新が新しいもの）は戻さない。
+        """
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET status = 'queued', updated_at = ? WHERE status = 'running' AND updated_at < ?",
+                (_now(), self._stale_before())
+            )
+
+
+class BlobJobStore(JobStore):
+    """Blob Storage に保存するジョブストア（スケールアウトした全インスタンスで共有）
+
+    ジョブごとに1つの JSON Blob（{job_id}.json）に状態とチャンクを保存し、状態と登録日時は
+    一覧で絞り込めるようメタデータにも持つ。更新は ETag による楽観的排他制御で行うため、
+    複数インスタンスのワーカーが同じジョブを取得することはない。
+    """
+
+    CONTAINER_NAME = os.getenv("INGEST_JOB_CONTAINER_NAME", "ingest-jobs")
+    MAX_UPDATE_ATTEMPTS = 10
+
+    def __init__(self, container_name: Optional[str] = None):
+        connection_string = os.getenv("AZURE_STORAGE_CONNECTION_STRING")
+        if not connection_string:
+            raise Exception("Azure Storage is not configured")
+
+        self.container_client = BlobServiceClient.from_connection_string(
+            connection_string,
+            retry_total=0  # 再試行はレジリエンス層で行う
+        ).get_container_client(container_name or self.CONTAINER_NAME)
+        self._container_ready = False
+
+    def _ensure_container(self):
+        """初回の登録時にコンテナーを作成"""
+        if self._container_ready:
+            return
+        try:
+            self._call(self.container_client.create_container)
+        except ResourceExistsError:
+            pass
+        self._container_ready = True
+
+    def _call(self, fn, *args, **kwargs):
+        return resilient_call("azure_blob", fn, *args, is_transient=is_transient_azure_error, **kwargs)
+
+    def _read(self, job_id: str):
+        """ジョブと ETag（なければ (None, None)）"""
+        try:
+            downloader = self._call(self.container_client.get_blob_client(f"{job_id}.json").download_blob)
+        except ResourceNotFoundError:
+            return None, None
+        return json.loads(downloader.readall()), downloader.properties.etag
+
+    def _write(self, job: Dict[str, Any], etag: Optional[str]):
+        """ジョブを保存（etag を指定した場合は読み込み後に更新されていなければ、None の場合は新規のみ）"""
+        conditions = (
+            {"etag": etag, "match_condition": MatchConditions.IfNotModified}
+            if etag else {"overwrite": False}
+        )
+        self._call(
+            self.container_client.get_blob_client(f"{job['job_id']}.json").upload_blob,
+            json.dumps(job, ensure_ascii=False),
+            metadata={"status": job["status"], "created_at": job["created_at"]},
+            **conditions
+        )
+
+    def _update(self, job_id: str, mutate: Callable[[Dict[str, Any]], bool]) -> Optional[Dict[str, Any]]:
+        """ジョブを読み込んで mutate で変更し、競合した場合は読み込みからやり直す
+
+        mutate が False を返した場合は保存せずに None を返す。
+        """
+        for _ in range(self.MAX_UPDATE_ATTEMPTS):
+            job, etag = self._read(job_id)
+            if job is None or mutate(job) is False:
+                return None
+            job["updated_at"] = _now()
+            try:
+                self._write(job, etag)
+                return job
+            except ResourceModifiedError:
+                continue
+        raise Exception(f"Job {job_id} could not be updated because of concurrent updates")
+
+    def enqueue(self, file_name: str, content_type: str = "") -> Dict[str, Any]:
+        now = _now()
+        job = {
+            "job_id": str(uuid.uuid4()),
+            "file_name": file_name,
+            "content_type": content_type,
+            "status": "queued",
+            "file_type": None,
+            "total_chunks": 0,
+            "processed_chunks": 0,
+            "indexed_chunks": 0,
+            "error": None,
+            "created_at": now,
+            "updated_at": now,
+            "chunks": []
+        }
+        self._ensure_container()
+        self._write(job, None)
+        return self.get_job(job["job_id"], include_chunks=False)
+
+    def claim_next(self) -> Optional[Dict[str, Any]]:
+        stale_before = datetime.now(timezone.utc) - timedelta(seconds=self.STALE_SECONDS)
+        try:
+            blobs = self._call(lambda: list(self.container_client.list_blobs(include=["metadata"])))
+        except ResourceNotFoundError:
+            return None  # まだジョブが登録されていない（コンテナーがない）
+        candidates = [
+            blob for blob in blobs
+            if (blob.metadata or {}).get("status") == "queued"
+            or ((blob.metadata or {}).get("status") == "running" and blob.last_modified < stale_before)
+        ]
+        candidates.sort(key=lambda blob: blob.metadata.get("created_at", ""))
+
+        for blob in candidates:
+            def claim(job: Dict[str, Any]) -> bool:
+                if job["status"] == "running":
+                    # 一覧の取得後に更新された（別のワーカーが処理中）なら取らない
+                    if datetime.fromisoformat(job["updated_at"]) >= stale_before:
+                        return False
+                elif job["status"] != "queued":
+                    return False
+                job["status"] = "running"
+                return True
+
+            job = self._update(os.path.splitext(blob.name)[0], claim)
+            if job is not None:
+                return self.get_job(job["job_id"], include_chunks=False)
+        return None
+
+    def recover_interrupted(self):
+        """停止したインスタンスのジョブは claim_next が STALE_SECONDS 経過後に取り直すため、ここでは何もしない"""
+
+    def set_chunks(self, job_id: str, file_type: str, chunk_ids: List[str]):
+        def mutate(job):
+            job["file_type"] = file_type
+            job["chunks"] = [{"chunk_id": chunk_id, "status": "pending"} for chunk_id in chunk_ids]
+            job["total_chunks"] = len(chunk_ids)
+            job["processed_chunks"] = job["indexed_chunks"] = 0
+        self._update(job_id, mutate)
+
+    def add_chunks(self, job_id: str, start_seq: int, chunk_ids: List[str]):
+        def mutate(job):
+            chunks = job["chunks"][:start_seq]
+            chunks.extend({"chunk_id": chunk_id, "status": "pending"} for chunk_id in chunk_ids)
+            job["chunks"] = chunks + job["chunks"][start_seq + len(chunk_ids):]
+            job["total_chunks"] += len(chunk_ids)
+        self._update(job_id, mutate)
+
+    def record_chunk_results(self, job_id: str, start_seq: int, chunk_results: List[dict]):
+        def mutate(job):
+            for i, r in enumerate(chunk_results):
+                chunk = job["chunks"][start_seq + i]
+                chunk.update({
+                    key: r.get(key) for key in ("status", "chars", "title", "category", "error")
+                })
+            job["processed_chunks"] += len(chunk_results)
+            job["indexed_chunks"] += sum(1 for r in chunk_results if r["status"] == "indexed")
+        self._update(job_id, mutate)
+
+    def complete(self, job_id: str):
+        self._update(job_id, lambda job: job.update(status="completed"))
+
+    def fail(self, job_id: str, error: str):
+        self._update(job_id, lambda job: job.update(status="failed", error=error))
+
+    def get_job(self, job_id: str, include_chunks: bool = True) -> Optional[Dict[str, Any]]:
+        job, _ = self._read(job_id)
+        if job is None:
+            return None
+        chunks = job.pop("chunks")
+        if include_chunks:
+            job["chunks"] = [
+                {key: value for key, value in chunk.items() if value is not None}
+                for chunk in chunks
+            ]
+        return _with_progress(job)
+
+
+class JobService:
+    """取り込みジョブのキューとプロセス内ワーカー
+
+    アップロード時はジョブを登録してすぐにIDを返し、ワーカースレッドが
+    チャンクの抽出・エンリッチ・インデックス登録を行う。ジョブの状態・進捗・チャンクごとの
+    状態は JobStore に保存する（既定は SQLiteJobStore）。
+    """
+
+    WORKER_COUNT = int(os.getenv("INGEST_JOB_WORKERS", "1"))
+    POLL_INTERVAL = float(os.getenv("INGEST_JOB_POLL_INTERVAL", "5"))
+
+    def __init__(self, store: Optional[JobStore] = None):
+        self.store = store or SQLiteJobStore()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._workers: List[threading.Thread] = []
+
+    def enqueue(self, file_name: str, content_type: str = "") -> Dict[str, Any]:
+        """ジョブを登録して待機中のワーカーを起こす"""
+        job = self.store.enqueue(file_name, content_type)
+        self._wakeup.set()
+        return job
+
+    def set_chunks(self, job_id: str, file_type: str, chunk_ids: List[str]):
+        self.store.set_chunks(job_id, file_type, chunk_ids)
+
+    def add_chunks(self, job_id: str, start_seq: int, chunk_ids: List[str]):
+        self.store.add_chunks(job_id, start_seq, chunk_ids)
+
+    def record_chunk_results(self, job_id: str, start_seq: int, chunk_results: List[dict]):
+        self.store.record_chunk_results(job_id, start_seq, chunk_results)
+
+    def get_job(self, job_id: str, include_chunks: bool = True) -> Optional[Dict[str, Any]]:
+        return self.store.get_job(job_id, include_chunks)
+
+    def start_workers(self, handler: Callable[[Dict[str, Any]], None]):
+        """ワーカースレッドを起動（起動済みなら何もしない）
+
+        前回のプロセスで中断されたジョブは、ストアの recover_interrupted で再実行できる状態に戻す。
+        """
+        with self._lock:
+            if self._workers:
+                return
+            self.store.recover_interrupted()
+            for i in range(self.WORKER_COUNT):
+                worker = threading.Thread(
+                    target=self._worker_loop,
+                    args=(handler,),
+                    name=f"ingest-job-worker-{i + 1}",
+                    daemon=True
+                )
+                worker.start()
+                self._workers.append(worker)
+
+    def _worker_loop(self, handler: Callable[[Dict[str, Any]], None]):
+        while True:
+            self._wakeup.clear()
+            try:
+                job = self.store.claim_next()
+            except Exception as e:
+                print(f"[Job] Failed to fetch the next job: {e}")
+                job = None
+            if job is None:
+                self._wakeup.wait(self.POLL_INTERVAL)
+                continue
+
+            print(f"[Job] {job['job_id']} started: {job['file_name']}")
+            try:
+                handler(job)
+                self.store.complete(job["job_id"])
+                print(f"[Job] {job['job_id']} completed")
+            except Exception as e:
+                print(f"[Job] {job['job_id']} failed: {e}")
+                try:
+                    self.store.fail(job["job_id"], str(e))
+                except Exception as store_error:
+                    # 記録できなくてもワーカーは止めない（中断されたジョブとして後で再実行される）
+                    print(f"[Job] {job['job_id']} could not be marked as failed: {store_error}")
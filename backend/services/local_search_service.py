@@ -0,0 +1,371 @@
+import os
+import re
+import math
+import heapq
+import threading
+import unicodedata
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Dict, List
+
+import numpy as np
+
+try:
+    import hnswlib
+except ImportError:  # 近似最近傍探索は任意（未インストールの場合は全件の内積で検索）
+    hnswlib = None
+
+from .search_backend import SearchBackend
+
+
+# 英数字の並び、またはそれ以外の文字（漢字・かな等）の並び
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+|[^\W\da-z_]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """検索用のトークン列（英数字は単語単位、日本語などは1文字と文字バイグラムの両方）
+
+    1文字のクエリ（「東」など）でもヒットするよう、バイグラムに加えて1文字ずつのトークンも入れる。
+    """
+    tokens = []
+    for run in _TOKEN_PATTERN.findall(unicodedata.normalize("NFKC", text).lower()):
+        if run.isascii() or len(run) == 1:
+            tokens.append(run)
+        else:
+            tokens.extend(run)
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+class LocalSearchService(SearchBackend):
+    """プロセス内で動く検索インデックス（SearchService と同じスキーマ・メソッド）
+
+    ローカル開発・CI・負荷試験で Azure AI Search の代わりに使う（SEARCH_BACKEND=local）。
+    ベクトルは正規化して NumPy の行列に持ち、コサイン類似度で検索する（hnswlib がインストールされていれば、
+    件数が ANN_MIN_DOCUMENTS 以上のときは HNSW で近似検索する）。全文検索は BM25 の転置インデックス、
+    ハイブリッド検索は RRF（Reciprocal Rank Fusion）で統合する。インデックスはメモリ上にだけ持つ。
+    """
+
+    PERSISTENT = False
+    VECTOR_DIMENSIONS = 1536
+    # "auto": hnswlib があれば使う / "hnsw": 必須 / "exact": 使わない
+    ANN_MODE = os.getenv("LOCAL_SEARCH_ANN", "auto").lower()
+    ANN_MIN_DOCUMENTS = int(os.getenv("LOCAL_SEARCH_ANN_MIN_DOCUMENTS", "20000"))
+    HNSW_M = 16
+    HNSW_EF_CONSTRUCTION = 200
+    HNSW_EF_SEARCH = 100
+
+    BM25_K1 = 1.2
+    BM25_B = 0.75
+    # ハイブリッド検索で統合する全文検索の候補数（Azure AI Search と同じ 50）と RRF の定数
+    HYBRID_TEXT_CANDIDATES = 50
+    RRF_K = 60
+
+    def __init__(self):
+        self.index_name = os.getenv("AZURE_SEARCH_INDEX_NAME", "documents-index")
+        if self.ANN_MODE == "hnsw" and hnswlib is None:
+            raise Exception("LOCAL_SEARCH_ANN=hnsw requires hnswlib (pip install hnswlib)")
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self):
+        self._documents: Dict[str, dict] = {}
+        self._ids_by_file: Dict[str, set] = {}
+        # ベクトル: 行 i が self._row_ids[i] のドキュメント（削除時は最終行を詰める）
+        self._vectors = np.empty((0, self.VECTOR_DIMENSIONS), dtype=np.float32)
+        self._row_ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+        # BM25: 単語 → {ドキュメントID: 出現回数}
+        self._postings: Dict[str, Dict[str, int]] = {}
+        self._doc_terms: Dict[str, Counter] = {}
+        self._doc_lengths: Dict[str, int] = {}
+        self._total_length = 0
+        # HNSW（件数が ANN_MIN_DOCUMENTS に達した時点で作成し、以降は登録・削除に合わせて更新）
+        self._ann = None
+        self._labels: Dict[str, int] = {}
+        self._label_ids: Dict[int, str] = {}
+        self._next_label = 0
+
+    def create_index(self) -> bool:
+        """Create the index (the local index needs no setup)"""
+        return True
+
+    def index_document(self, doc_id: str, title: str, content: str, file_name: str, embedding: List[float], category: str = "") -> dict:
+        """Index a document in the local index"""
+        with self._lock:
+            self._upsert(self._build_document(doc_id, title, content, file_name, category), embedding)
+        return {"indexed": True, "id": doc_id}
+
+    def index_documents(self, docs: List[dict]) -> dict:
+        """Index (merge or upload) many documents
+
+        docs の各要素は index_document と同じキー（doc_id, title, content, file_name, embedding, category）を持つ
+        """
+        indexed_ids = []
+        failed = []
+        with self._lock:
+            for doc in docs:
+                try:
+                    document = self._build_document(
+                        doc["doc_id"], doc["title"], doc["content"], doc["file_name"], doc.get("category", "")
+                    )
+                    self._upsert(document, doc["embedding"])
+                    indexed_ids.append(doc["doc_id"])
+                except Exception as e:
+                    failed.append({"id": doc["doc_id"], "error": str(e)})
+
+        return {
+            "indexed": len(indexed_ids),
+            "indexed_ids": indexed_ids,
+            "failed": failed,
+            "batches": 1
+        }
+
+    def _build_document(self, doc_id: str, title: str, content: str, file_name: str, category: str = "") -> dict:
+        """インデックススキーマに合わせたドキュメントを作成（ベクトルは別に持つ）"""
+        return {
+            "id": doc_id,
+            "title": title,
+            "content": content,
+            "file_name": file_name,
+            "upload_date": datetime.now(timezone.utc).isoformat(),
+            "category": category
+        }
+
+    def _upsert(self, document: dict, embedding: List[float]):
+        vector = np.asarray(embedding, dtype=np.float32)
+        if vector.shape != (self.VECTOR_DIMENSIONS,):
+            raise Exception(f"content_vector must have {self.VECTOR_DIMENSIONS} dimensions, got {vector.size}")
+        norm = np.linalg.norm(vector)
+        if norm:
+            vector = vector / norm
+
+        doc_id = document["id"]
+        if doc_id in self._documents:
+            self._remove(doc_id)
+
+        self._documents[doc_id] = document
+        self._ids_by_file.setdefault(document["file_name"], set()).add(doc_id)
+
+        # ベクトル行列に1行追加（容量は倍々で確保）
+        row = len(self._row_ids)
+        if row == len(self._vectors):
+            grown = np.empty((max(64, row * 2), self.VECTOR_DIMENSIONS), dtype=np.float32)
+            grown[:row] = self._vectors[:row]
+            self._vectors = grown
+        self._vectors[row] = vector
+        self._row_ids.append(doc_id)
+        self._rows[doc_id] = row
+
+        # 検索対象フィールド（title / content / category）の転置インデックス
+        terms = Counter(tokenize(f"{document['title']}\n{document['content']}\n{document['category']}"))
+        self._doc_terms[doc_id] = terms
+        self._doc_lengths[doc_id] = sum(terms.values())
+        self._total_length += self._doc_lengths[doc_id]
+        for term, count in terms.items():
+            self._postings.setdefault(term, {})[doc_id] = count
+
+        if self._ann is not None:
+            self._ann_add(doc_id, vector)
+        elif self._use_ann():
+            # 件数が閾値に達した時点で作成する（作成に時間がかかるため検索時ではなく登録時に行う）
+            self._build_ann()
+
+    def _remove(self, doc_id: str):
+        document = self._documents.pop(doc_id, None)
+        if document is None:
+            return
+
+        file_ids = self._ids_by_file.get(document["file_name"])
+        if file_ids is not None:
+            file_ids.discard(doc_id)
+            if not file_ids:
+                del self._ids_by_file[document["file_name"]]
+
+        # 最終行を削除した行に移して行列を詰める
+        row = self._rows.pop(doc_id)
+        last = len(self._row_ids) - 1
+        if row != last:
+            moved_id = self._row_ids[last]
+            self._vectors[row] = self._vectors[last]
+            self._row_ids[row] = moved_id
+            self._rows[moved_id] = row
+        self._row_ids.pop()
+
+        terms = self._doc_terms.pop(doc_id)
+        self._total_length -= self._doc_lengths.pop(doc_id)
+        for term in terms:
+            postings = self._postings[term]
+            del postings[doc_id]
+            if not postings:
+                del self._postings[term]
+
+        label = self._labels.pop(doc_id, None)
+        if label is not None:
+            self._ann.mark_deleted(label)
+            del self._label_ids[label]
+
+    def _ann_add(self, doc_id: str, vector: np.ndarray):
+        if self._ann.get_current_count() >= self._ann.get_max_elements():
+            self._ann.resize_index(self._ann.get_max_elements() * 2)
+        label = self._next_label
+        self._next_label += 1
+        self._ann.add_items(vector[np.newaxis, :], np.array([label]), replace_deleted=True)
+        self._labels[doc_id] = label
+        self._label_ids[label] = doc_id
+
+    def _use_ann(self) -> bool:
+        if hnswlib is None or self.ANN_MODE == "exact":
+            return False
+        return self.ANN_MODE == "hnsw" or len(self._row_ids) >= self.ANN_MIN_DOCUMENTS
+
+    def _build_ann(self):
+        """登録済みの全ベクトルから HNSW インデックスを作成"""
+        count = len(self._row_ids)
+        self._ann = hnswlib.Index(space="cosine", dim=self.VECTOR_DIMENSIONS)
+        self._ann.init_index(
+            max_elements=max(1024, count * 2), ef_construction=self.HNSW_EF_CONSTRUCTION,
+            M=self.HNSW_M, allow_replace_deleted=True
+        )
+        self._ann.set_ef(self.HNSW_EF_SEARCH)
+        self._labels, self._label_ids = {}, {}
+        self._next_label = count
+        if count:
+            self._ann.add_items(self._vectors[:count], np.arange(count))
+            self._labels = {doc_id: label for label, doc_id in enumerate(self._row_ids)}
+            self._label_ids = dict(enumerate(self._row_ids))
+
+    def _vector_ranking(self, query_vector: List[float], k: int) -> List[tuple]:
+        """コサイン類似度の高い順に (ドキュメントID, 類似度)"""
+        count = len(self._row_ids)
+        k = min(k, count)
+        if k <= 0:
+            return []
+
+        query = np.asarray(query_vector, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm:
+            query = query / norm
+
+        if self._ann is not None:
+            self._ann.set_ef(max(self.HNSW_EF_SEARCH, k))
+            labels, distances = self._ann.knn_query(query, k=k)
+            return [(self._label_ids[int(label)], 1.0 - float(distance)) for label, distance in zip(labels[0], distances[0])]
+
+        similarities = self._vectors[:count] @ query
+        top = np.argpartition(-similarities, k - 1)[:k] if k < count else np.arange(count)
+        top = top[np.argsort(-similarities[top])]
+        return [(self._row_ids[row], float(similarities[row])) for row in top]
+
+    def _text_ranking(self, query: str, k: int) -> List[tuple]:
+        """BM25 スコアの高い順に (ドキュメントID, スコア)（いずれかの単語を含むドキュメントが対象）"""
+        if query.strip() == "*":
+            return [(doc_id, 1.0) for doc_id in list(self._documents)[:k]]
+
+        count = len(self._documents)
+        if not count:
+            return []
+        avg_length = self._total_length / count
+
+        scores: Dict[str, float] = {}
+        for term in set(tokenize(query)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_id, tf in postings.items():
+                norm = self.BM25_K1 * (1 - self.BM25_B + self.BM25_B * self._doc_lengths[doc_id] / avg_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.BM25_K1 + 1) / (tf + norm)
+
+        return heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+
+    def _to_result(self, doc_id: str, score: float) -> dict:
+        doc = self._documents[doc_id]
+        return {
+            "id": doc["id"],
+            "title": doc["title"],
+            "content": doc["content"][:500] + "..." if len(doc["content"]) > 500 else doc["content"],
+            "file_name": doc["file_name"],
+            "upload_date": doc.get("upload_date"),
+            "category": doc.get("category", ""),
+            "score": score
+        }
+
+    def search(self, query: str, top: int = 5) -> List[dict]:
+        """Full-text search (BM25)"""
+        with self._lock:
+            return [self._to_result(doc_id, score) for doc_id, score in self._text_ranking(query, top)]
+
+    def vector_search(self, query_vector: List[float], top: int = 5) -> List[dict]:
+        """Vector similarity search"""
+        with self._lock:
+            # スコアは Azure AI Search のコサイン類似度と同じ 1 / (1 + (1 - 類似度))
+            return [
+                self._to_result(doc_id, 1.0 / (2.0 - similarity))
+                for doc_id, similarity in self._vector_ranking(query_vector, top)
+            ]
+
+    def hybrid_search(self, query: str, query_vector: List[float], top: int = 5, use_semantic: bool = False) -> List[dict]:
+        """Hybrid search combining full-text and vector results with RRF (semantic reranking is not available locally)"""
+        with self._lock:
+            fused: Dict[str, float] = {}
+            rankings = (self._text_ranking(query, max(top, self.HYBRID_TEXT_CANDIDATES)), self._vector_ranking(query_vector, top))
+            for ranking in rankings:
+                for rank, (doc_id, _) in enumerate(ranking, 1):
+                    fused[doc_id] = fused.get(doc_id, 0.0) + 1.0 / (self.RRF_K + rank)
+
+            results = []
+            for doc_id, score in heapq.nlargest(top, fused.items(), key=lambda item: item[1]):
+                result = self._to_result(doc_id, score)
+                result["reranker_score"] = None
+                results.append(result)
+            return results
+
+    def delete_document(self, doc_id: str) -> bool:
+        """Delete a document from the index"""
+        with self._lock:
+            self._remove(doc_id)
+        return True
+
+    def delete_documents(self, doc_ids: List[str]) -> dict:
+        """Delete many documents from the index"""
+        with self._lock:
+            for doc_id in doc_ids:
+                self._remove(doc_id)
+        # Azure AI Search と同じく、存在しないIDの削除も成功として数える
+        return {"deleted": len(doc_ids), "failed": []}
+
+    def delete_by_file(self, file_name: str) -> dict:
+        """Delete every chunk of a file"""
+        doc_ids = self._list_ids_by_file(file_name)
+        if not doc_ids:
+            return {"deleted": 0, "failed": []}
+        return self.delete_documents(doc_ids)
+
+    def delete_stale_chunks(self, file_name: str, keep_ids: List[str]) -> dict:
+        """Delete the chunks of a file whose ids are not in keep_ids (left over from a previous ingest)"""
+        keep = set(keep_ids)
+        stale_ids = [doc_id for doc_id in self._list_ids_by_file(file_name) if doc_id not in keep]
+        if not stale_ids:
+            return {"deleted": 0, "failed": []}
+        return self.delete_documents(stale_ids)
+
+    def _list_ids_by_file(self, file_name: str) -> List[str]:
+        with self._lock:
+            return list(self._ids_by_file.get(file_name, ()))
+
+    def clear_all(self) -> dict:
+        """Clear all documents"""
+        with self._lock:
+            self._reset()
+        return {"cleared": True, "index_name": self.index_name}
+
+    def stats(self) -> dict:
+        """件数・語彙数・ベクトル検索の方式"""
+        with self._lock:
+            return {
+                "documents": len(self._documents),
+                "files": len(self._ids_by_file),
+                "terms": len(self._postings),
+                "vector_search": "hnsw" if self._ann is not None else "exact"
+            }
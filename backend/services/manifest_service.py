@@ -0,0 +1,78 @@
+import os
+import json
+import sqlite3
+import tempfile
+import threading
+from datetime import datetime, timezone
+from typing import List, Optional, Dict, Any
+
+
+class IndexManifest:
+    """インデックス済みファイルのマニフェスト（SQLite）
+
+    Blob名ごとに ETag・最終更新日時・内容ハッシュと登録したチャンクIDを記録し、
+    再インデックス時に新規・変更ファイルだけを処理し、削除されたファイルのチャンクを
+    インデックスから取り除くために使う。
+    """
+
+    DB_PATH = os.getenv("INDEX_MANIFEST_PATH", os.path.join(tempfile.gettempdir(), "index_manifest.db"))
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or self.DB_PATH
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._conn:
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS files (
+                    file_name TEXT PRIMARY KEY,
+                    etag TEXT,
+                    last_modified TEXT,
+                    content_hash TEXT,
+                    chunk_ids TEXT NOT NULL,
+                    indexed_at TEXT NOT NULL
+                )
+                """
+            )
+
+    @staticmethod
+    def _to_entry(row: sqlite3.Row) -> Dict[str, Any]:
+        entry = dict(row)
+        entry["chunk_ids"] = json.loads(entry["chunk_ids"])
+        return entry
+
+    def get(self, file_name: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM files WHERE file_name = ?", (file_name,)).fetchone()
+        return self._to_entry(row) if row else None
+
+    def all(self) -> Dict[str, Dict[str, Any]]:
+        """全エントリを Blob名 → エントリ の辞書で返す"""
+        with self._lock:
+            rows = self._conn.execute("SELECT * FROM files").fetchall()
+        return {row["file_name"]: self._to_entry(row) for row in rows}
+
+    def upsert(self, file_name: str, etag: Optional[str], last_modified: Optional[str],
+               content_hash: Optional[str], chunk_ids: List[str]):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO files (file_name, etag, last_modified, content_hash, chunk_ids, indexed_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (file_name, etag, last_modified, content_hash, json.dumps(chunk_ids), datetime.now(timezone.utc).isoformat())
+            )
+
+    def update_blob_info(self, file_name: str, etag: Optional[str], last_modified: Optional[str]):
+        """内容が変わっていない場合に ETag・最終更新日時だけを更新"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE files SET etag = ?, last_modified = ? WHERE file_name = ?",
+                (etag, last_modified, file_name)
+            )
+
+    def delete(self, file_name: str):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM files WHERE file_name = ?", (file_name,))
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM files")
@@ -1,8 +1,18 @@
 import os
+import re
 import json
-from openai import AzureOpenAI
+import time
+import array
+import unicodedata
+from email.utils import parsedate_to_datetime
+from openai import AzureOpenAI, RateLimitError, APIConnectionError, InternalServerError
 from typing import List, Optional, Dict, Any, Callable
 
+from .enrichment_cache import EnrichmentCache
+from .ttl_cache import TTLCache
+from .rate_limiter import RateLimiter, PRIORITY_INTERACTIVE, PRIORITY_BULK
+from .resilience import resilient_call, remaining_time, check_deadline
+
 
 # 社員用のtools定義
 EMPLOYEE_TOOLS = [
@@ -77,16 +87,45 @@ EMPLOYEE_TOOLS = [
 ]
 
 
+# チャンク分類で使用するカテゴリ
+CHUNK_CATEGORIES = ["仕事", "技術", "家族", "趣味", "健康", "学習", "金融", "その他"]
+
+
+def estimate_tokens(text: str) -> int:
+    """トークン数の概算（日本語は1文字≒1トークン、ASCIIは4文字≒1トークン）"""
+    ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+    return (len(text) - ascii_chars) + (ascii_chars + 3) // 4
+
+
+def _is_transient_openai_error(error: Exception) -> bool:
+    """再試行すべき一時的なエラー（接続エラー・タイムアウト・5xx）"""
+    return isinstance(error, (APIConnectionError, InternalServerError))
+
+
 class OpenAIService:
+    # 埋め込みリクエスト1回あたりの上限（入力数・推定トークン数）
+    EMBEDDING_BATCH_SIZE = int(os.getenv("AZURE_OPENAI_EMBEDDING_BATCH_SIZE", "16"))
+    EMBEDDING_BATCH_MAX_TOKENS = int(os.getenv("AZURE_OPENAI_EMBEDDING_BATCH_MAX_TOKENS", "8000"))
+    # デプロイメントのクォータ（0 は制限なし）と、429 の再試行回数
+    RATE_LIMIT_RPM = int(os.getenv("AZURE_OPENAI_RPM", "0"))
+    RATE_LIMIT_TPM = int(os.getenv("AZURE_OPENAI_TPM", "0"))
+    MAX_RETRIES = int(os.getenv("AZURE_OPENAI_MAX_RETRIES", "5"))
+    # 検索・チャットのクエリ埋め込みのキャッシュ（有効期限・メモリ上限）
+    QUERY_EMBEDDING_CACHE_TTL = float(os.getenv("QUERY_EMBEDDING_CACHE_TTL", "3600"))
+    QUERY_EMBEDDING_CACHE_MAX_BYTES = int(os.getenv("QUERY_EMBEDDING_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
     def __init__(self):
         api_key = os.getenv("AZURE_OPENAI_API_KEY")
         endpoint = os.getenv("AZURE_OPENAI_ENDPOINT")
 
         if api_key and endpoint:
+            # 再試行は Retry-After をスケジューラに反映させるため、SDKではなく
+            # _call_with_rate_limit（429）とレジリエンス層（接続エラー・5xx）で行う
             self.client = AzureOpenAI(
                 api_key=api_key,
                 api_version="2024-02-15-preview",
-                azure_endpoint=endpoint
+                azure_endpoint=endpoint,
+                max_retries=0
             )
         else:
             self.client = None
@@ -95,16 +134,93 @@ class OpenAIService:
         self.embedding_model = os.getenv("AZURE_OPENAI_EMBEDDING_MODEL", "text-embedding-ada-002")
         self._tool_handlers: Dict[str, Callable] = {}
 
+        # チャットと取り込みで同じデプロイメントのクォータを共有するため、全呼び出しをここで制御する
+        self.rate_limiter = RateLimiter(rpm=self.RATE_LIMIT_RPM, tpm=self.RATE_LIMIT_TPM)
+
+        # チャンクのエンリッチ結果キャッシュ（本文が変わらない限りAPIを呼ばない）
+        if os.getenv("ENRICHMENT_CACHE_ENABLED", "true").lower() == "true":
+            self.enrichment_cache = EnrichmentCache()
+        else:
+            self.enrichment_cache = None
+
+        # 同じ質問の繰り返しで埋め込みAPIを呼ばないよう、クエリの埋め込みをメモリに保持する
+        if os.getenv("QUERY_EMBEDDING_CACHE_ENABLED", "true").lower() == "true":
+            self.query_embedding_cache = TTLCache(self.QUERY_EMBEDDING_CACHE_TTL, self.QUERY_EMBEDDING_CACHE_MAX_BYTES)
+        else:
+            self.query_embedding_cache = None
+
     def register_tool_handler(self, name: str, handler: Callable):
         """ツールハンドラーを登録"""
         self._tool_handlers[name] = handler
 
+    def _create_chat_completion(self, priority: int, **kwargs):
+        """レート制限を通してチャット補完APIを呼び出す"""
+        # Azure OpenAI は入力トークン + max_tokens をクォータとして計上する
+        estimated = sum(estimate_tokens(str(m.get("content") or "")) for m in kwargs["messages"])
+        if "tools" in kwargs:
+            estimated += estimate_tokens(json.dumps(kwargs["tools"], ensure_ascii=False))
+        estimated += kwargs.get("max_tokens", 0)
+        return self._call_with_rate_limit(self.client.chat.completions.create, priority, estimated, **kwargs)
+
+    def _create_embeddings(self, priority: int, **kwargs):
+        """レート制限を通して埋め込みAPIを呼び出す"""
+        inputs = kwargs["input"] if isinstance(kwargs["input"], list) else [kwargs["input"]]
+        estimated = sum(estimate_tokens(text) for text in inputs)
+        return self._call_with_rate_limit(self.client.embeddings.create, priority, estimated, **kwargs)
+
+    def _call_with_rate_limit(self, create: Callable, priority: int, estimated_tokens: int, **kwargs):
+        """クォータを予約してから呼び出し、429 は Retry-After の間スケジューラ全体を止めて再試行
+
+        接続エラー・5xx はレジリエンス層（ジッター付き再試行・サーキットブレーカー）で扱い、
+        リクエストの期限が設定されていれば残り時間をタイムアウトとして渡す。
+        """
+        def call():
+            self.rate_limiter.acquire(estimated_tokens, priority)
+            remaining = remaining_time()
+            if remaining is not None:
+                return create(timeout=max(remaining, 0.1), **kwargs)
+            return create(**kwargs)
+
+        for attempt in range(self.MAX_RETRIES + 1):
+            try:
+                response = resilient_call("azure_openai", call, is_transient=_is_transient_openai_error)
+            except RateLimitError as e:
+                if attempt >= self.MAX_RETRIES:
+                    raise
+                delay = self._retry_after_seconds(e, attempt)
+                check_deadline(delay)
+                self.rate_limiter.pause(delay)
+                continue
+
+            usage = getattr(response, "usage", None)
+            if usage is not None and getattr(usage, "total_tokens", None) is not None:
+                self.rate_limiter.record_usage(estimated_tokens, usage.total_tokens)
+            return response
+
+    @staticmethod
+    def _retry_after_seconds(error: RateLimitError, attempt: int) -> float:
+        """429 レスポンスの Retry-After（ms / 秒 / HTTP日付）を秒で返す。なければ指数バックオフ"""
+        headers = error.response.headers if error.response is not None else {}
+        try:
+            if headers.get("retry-after-ms"):
+                return float(headers["retry-after-ms"]) / 1000
+            if headers.get("retry-after"):
+                value = headers["retry-after"]
+                try:
+                    return float(value)
+                except ValueError:
+                    return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            pass
+        return float(min(2 ** attempt, 60))
+
     def summarize(self, text: str, max_length: int = 500) -> str:
         """Summarize the given text"""
         if not self.client:
             raise Exception("Azure OpenAI is not configured")
 
-        response = self.client.chat.completions.create(
+        response = self._create_chat_completion(
+            PRIORITY_INTERACTIVE,
             model=self.model,
             messages=[
                 {
@@ -127,7 +243,8 @@ class OpenAIService:
         if not self.client:
             raise Exception("Azure OpenAI is not configured")
 
-        response = self.client.chat.completions.create(
+        response = self._create_chat_completion(
+            PRIORITY_INTERACTIVE,
             model=self.model,
             messages=[
                 {
@@ -146,23 +263,99 @@ class OpenAIService:
         return response.choices[0].message.content
 
     def generate_embedding(self, text: str) -> List[float]:
-        """Generate embedding for the given text"""
+        """Generate embedding for the given query text (cached in memory by normalized text and model)"""
         if not self.client:
             raise Exception("Azure OpenAI is not configured")
 
-        response = self.client.embeddings.create(
+        # 全角・半角や空白の違いだけのクエリは同じ埋め込みを使う（APIにも正規化後のテキストを送る）
+        text = self._normalize_query(text)
+        key = (self.embedding_model, text)
+        if self.query_embedding_cache:
+            cached = self.query_embedding_cache.get(key)
+            if cached is not None:
+                return cached.tolist()
+
+        response = self._create_embeddings(
+            PRIORITY_INTERACTIVE,
             model=self.embedding_model,
             input=text
         )
+        embedding = response.data[0].embedding
+
+        if self.query_embedding_cache:
+            # float のリストではなく array（8バイト/要素）で保持する
+            vector = array.array("d", embedding)
+            self.query_embedding_cache.put(key, vector, vector.itemsize * len(vector) + len(text.encode("utf-8")))
+        return embedding
+
+    @staticmethod
+    def _normalize_query(text: str) -> str:
+        return re.sub(r"\s+", " ", unicodedata.normalize("NFKC", text)).strip()
+
+    def generate_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """Generate embeddings for many texts, packing them into as few requests as possible"""
+        if not self.client:
+            raise Exception("Azure OpenAI is not configured")
 
-        return response.data[0].embedding
+        # キャッシュにない本文だけAPIに問い合わせる（キャッシュの読み書きの失敗は呼び出しを失敗させない）
+        embeddings = [None] * len(texts)
+        if self.enrichment_cache:
+            try:
+                embeddings = self.enrichment_cache.get_embeddings(texts, self.embedding_model)
+            except Exception as e:
+                print(f"[WARN] Failed to read cached embeddings: {e}")
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+
+        fetched: List[List[float]] = []
+        for batch in self.batch_embedding_inputs([texts[i] for i in missing]):
+            response = self._create_embeddings(
+                PRIORITY_BULK,
+                model=self.embedding_model,
+                input=batch
+            )
+            # レスポンスの順序は保証されないため index で並べ直す
+            fetched.extend(item.embedding for item in sorted(response.data, key=lambda d: d.index))
+
+        for i, embedding in zip(missing, fetched):
+            embeddings[i] = embedding
+        if self.enrichment_cache and missing:
+            try:
+                self.enrichment_cache.put_embeddings([texts[i] for i in missing], fetched, self.embedding_model)
+            except Exception as e:
+                print(f"[WARN] Failed to cache embeddings: {e}")
+
+        return embeddings
+
+    def batch_embedding_inputs(self, texts: List[str]) -> List[List[str]]:
+        """入力数と推定トークン数の上限に収まるようにテキストをバッチ分割"""
+        batches: List[List[str]] = []
+        current: List[str] = []
+        current_tokens = 0
+
+        for text in texts:
+            tokens = estimate_tokens(text)
+            if current and (
+                len(current) >= self.EMBEDDING_BATCH_SIZE
+                or current_tokens + tokens > self.EMBEDDING_BATCH_MAX_TOKENS
+            ):
+                batches.append(current)
+                current = []
+                current_tokens = 0
+            current.append(text)
+            current_tokens += tokens
+
+        if current:
+            batches.append(current)
+
+        return batches
 
     def generate_chunk_title(self, text: str) -> str:
         """チャンクの内容から短いタイトルを生成（セマンティック検索最適化）"""
         if not self.client:
             raise Exception("Azure OpenAI is not configured")
 
-        response = self.client.chat.completions.create(
+        response = self._create_chat_completion(
+            PRIORITY_BULK,
             model=self.model,
             messages=[
                 {
@@ -185,7 +378,8 @@ class OpenAIService:
         if not self.client:
             raise Exception("Azure OpenAI is not configured")
 
-        response = self.client.chat.completions.create(
+        response = self._create_chat_completion(
+            PRIORITY_BULK,
             model=self.model,
             messages=[
                 {
@@ -214,6 +408,87 @@ class OpenAIService:
 
         return response.choices[0].message.content.strip()
 
+    def enrich_chunk(self, text: str, file_name: str, chunk_id: str) -> Dict[str, str]:
+        """チャンクのタイトルとカテゴリを1回の呼び出しでJSONとして生成（セマンティック検索最適化）"""
+        if not self.client:
+            raise Exception("Azure OpenAI is not configured")
+
+        if self.enrichment_cache:
+            try:
+                cached = self.enrichment_cache.get_enrichment(text, self.model)
+            except Exception as e:
+                print(f"[WARN] Failed to read cached enrichment: {e}")
+                cached = None
+            if cached:
+                return cached
+
+        response = self._create_chat_completion(
+            PRIORITY_BULK,
+            model=self.model,
+            messages=[
+                {
+                    "role": "system",
+                    "content": """あなたはテキストの内容を要約・分類するアシスタントです。
+与えられたテキストについて、以下の2つを生成してください：
+- title: 内容を「〇〇に関する情報」という形式で表す15文字以内の短いタイトル
+- category: 以下のカテゴリのいずれか1つ
+  - 仕事（業務、プロジェクト、会議、報告書など）
+  - 技術（プログラミング、システム、IT、開発など）
+  - 家族（家庭、育児、親族、家事など）
+  - 趣味（娯楽、スポーツ、旅行、ゲームなど）
+  - 健康（医療、運動、食事、メンタルなど）
+  - 学習（勉強、資格、教育、研修など）
+  - 金融（お金、投資、経済、保険など）
+  - その他
+
+{"title": "...", "category": "..."} の形式のJSONのみを出力してください。"""
+                },
+                {
+                    "role": "user",
+                    "content": text[:500]
+                }
+            ],
+            response_format={"type": "json_object"},
+            max_tokens=80,
+            temperature=0.2
+        )
+
+        parsed = self._parse_enrichment(response.choices[0].message.content)
+
+        # 検証を通った結果だけキャッシュする（フォールバック値はファイル固有のため保存しない）
+        if self.enrichment_cache and parsed["title"] and parsed["category"]:
+            try:
+                self.enrichment_cache.put_enrichment(text, self.model, parsed["title"], parsed["category"])
+            except Exception as e:
+                print(f"[WARN] Failed to cache enrichment: {e}")
+
+        return {
+            "title": parsed["title"] or f"{file_name} - {chunk_id}",
+            "category": parsed["category"] or "その他"
+        }
+
+    @staticmethod
+    def _parse_enrichment(content: Optional[str]) -> Dict[str, Optional[str]]:
+        """enrich_chunk の応答を検証（不正な項目は None）"""
+        title = None
+        category = None
+
+        try:
+            data = json.loads(content or "")
+        except (TypeError, ValueError):
+            data = None
+
+        if isinstance(data, dict):
+            raw_title = data.get("title")
+            if isinstance(raw_title, str) and raw_title.strip():
+                title = raw_title.strip()
+
+            raw_category = data.get("category")
+            if isinstance(raw_category, str) and raw_category.strip() in CHUNK_CATEGORIES:
+                category = raw_category.strip()
+
+        return {"title": title, "category": category}
+
     def chat(self, messages: List[dict], context: Optional[str] = None) -> str:
         """General chat with optional context (no tools)"""
         if not self.client:
@@ -225,7 +500,8 @@ class OpenAIService:
 
         all_messages = [{"role": "system", "content": system_message}] + messages
 
-        response = self.client.chat.completions.create(
+        response = self._create_chat_completion(
+            PRIORITY_INTERACTIVE,
             model=self.model,
             messages=all_messages,
             max_tokens=2000,
@@ -257,7 +533,8 @@ class OpenAIService:
         all_messages = [{"role": "system", "content": system_message}] + messages
 
         # 最初のリクエスト（toolsを含む）
-        response = self.client.chat.completions.create(
+        response = self._create_chat_completion(
+            PRIORITY_INTERACTIVE,
             model=self.model,
             messages=all_messages,
             tools=EMPLOYEE_TOOLS,
@@ -319,7 +596,8 @@ class OpenAIService:
                 })
 
             # ツール結果を含めて再度リクエスト
-            final_response = self.client.chat.completions.create(
+            final_response = self._create_chat_completion(
+                PRIORITY_INTERACTIVE,
                 model=self.model,
                 messages=all_messages,
                 max_tokens=2000,
@@ -0,0 +1,152 @@
+import heapq
+import itertools
+import threading
+import time
+from typing import Dict, Any
+
+from .resilience import DeadlineExceededError, remaining_time
+
+# 優先度（値が小さいほど優先）
+PRIORITY_INTERACTIVE = 0  # チャット・質問応答・検索クエリの埋め込み
+PRIORITY_BULK = 1         # 取り込み時のエンリッチ・埋め込み
+
+_PRIORITY_NAMES = {PRIORITY_INTERACTIVE: "interactive", PRIORITY_BULK: "bulk"}
+
+
+class RateLimiter:
+    """リクエスト数（RPM）とトークン数（TPM）のトークンバケットによるスケジューラ
+
+    呼び出し前に推定トークン数を予約し、バケットが空なら待機する。待機中の呼び出しは
+    優先度順（同じ優先度なら到着順）に払い出すため、対話的なチャットが一括取り込みより先に通る。
+    429 の Retry-After を受けた場合は pause() で全体の払い出しを止める。
+    rpm / tpm が 0 の場合はその制限を行わない（待機時間などの計測のみ）。
+    """
+
+    def __init__(self, rpm: int = 0, tpm: int = 0):
+        self.rpm = rpm
+        self.tpm = tpm
+        self._cond = threading.Condition()
+        self._available_requests = float(rpm)
+        self._available_tokens = float(tpm)
+        self._last_refill = time.monotonic()
+        self._paused_until = 0.0
+        self._waiters = []
+        self._sequence = itertools.count()
+        self._stats = {
+            name: {"requests": 0, "total_wait": 0.0, "max_wait": 0.0}
+            for name in _PRIORITY_NAMES.values()
+        }
+        self._throttled = 0
+
+    def _refill(self, now: float):
+        elapsed = now - self._last_refill
+        self._last_refill = now
+        if self.rpm:
+            self._available_requests = min(self.rpm, self._available_requests + elapsed * self.rpm / 60)
+        if self.tpm:
+            self._available_tokens = min(self.tpm, self._available_tokens + elapsed * self.tpm / 60)
+
+    def _wait_time(self, tokens: int, now: float) -> float:
+        """予約できるまでの待ち時間（秒）"""
+        wait = max(0.0, self._paused_until - now)
+        if self.rpm and self._available_requests < 1:
+            wait = max(wait, (1 - self._available_requests) * 60 / self.rpm)
+        if self.tpm and self._available_tokens < tokens:
+            wait = max(wait, (tokens - self._available_tokens) * 60 / self.tpm)
+        return wait
+
+    def acquire(self, tokens: int, priority: int = PRIORITY_BULK) -> float:
+        """1リクエスト分と推定トークン数を予約（必要なら待機）し、待機時間（秒）を返す
+
+        リクエストの期限までに予約できない場合は待ち行列から外れて DeadlineExceededError。
+        """
+        if self.tpm:
+            tokens = min(tokens, self.tpm)
+
+        started = time.monotonic()
+        with self._cond:
+            entry = (priority, next(self._sequence))
+            heapq.heappush(self._waiters, entry)
+            self._cond.notify_all()
+
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                remaining = remaining_time()
+                if self._waiters[0] == entry:
+                    wait = self._wait_time(tokens, now)
+                    if wait <= 0:
+                        break
+                    if remaining is not None and remaining <= wait:
+                        self._abandon(entry)
+                        raise DeadlineExceededError("Request deadline exceeded while waiting for rate limit")
+                    self._cond.wait(timeout=wait)
+                else:
+                    if remaining is not None and remaining <= 0:
+                        self._abandon(entry)
+                        raise DeadlineExceededError("Request deadline exceeded while waiting for rate limit")
+                    # 先頭の呼び出しが払い出されるまで待つ（期限がある場合は期限まで）
+                    self._cond.wait(timeout=remaining)
+
+            heapq.heappop(self._waiters)
+            if self.rpm:
+                self._available_requests -= 1
+            if self.tpm:
+                self._available_tokens -= tokens
+
+            waited = time.monotonic() - started
+            stats = self._stats[_PRIORITY_NAMES.get(priority, "bulk")]
+            stats["requests"] += 1
+            stats["total_wait"] += waited
+            stats["max_wait"] = max(stats["max_wait"], waited)
+            self._cond.notify_all()
+
+        return waited
+
+    def _abandon(self, entry: tuple):
+        """待ち行列から外す（ロックを保持した状態で呼ぶ）"""
+        self._waiters.remove(entry)
+        heapq.heapify(self._waiters)
+        self._cond.notify_all()
+
+    def record_usage(self, estimated_tokens: int, actual_tokens: int):
+        """実際の使用トークン数で予約分を補正"""
+        if not self.tpm:
+            return
+        with self._cond:
+            self._available_tokens = min(self.tpm, self._available_tokens + estimated_tokens - actual_tokens)
+            self._cond.notify_all()
+
+    def pause(self, seconds: float):
+        """429（Retry-After）を受けた場合に、指定秒数だけ全体の払い出しを止める"""
+        with self._cond:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._throttled += 1
+            self._cond.notify_all()
+
+    def metrics(self) -> Dict[str, Any]:
+        """待ち行列の長さ・待機時間などの計測値"""
+        with self._cond:
+            queue_depth = {name: 0 for name in _PRIORITY_NAMES.values()}
+            for priority, _ in self._waiters:
+                queue_depth[_PRIORITY_NAMES.get(priority, "bulk")] += 1
+
+            wait_times = {
+                name: {
+                    "requests": stats["requests"],
+                    "avg_wait_ms": round(stats["total_wait"] / stats["requests"] * 1000, 1) if stats["requests"] else 0.0,
+                    "max_wait_ms": round(stats["max_wait"] * 1000, 1)
+                }
+                for name, stats in self._stats.items()
+            }
+
+            return {
+                "rpm_limit": self.rpm,
+                "tpm_limit": self.tpm,
+                "available_requests": round(self._available_requests, 1) if self.rpm else None,
+                "available_tokens": round(self._available_tokens) if self.tpm else None,
+                "paused_for_ms": round(max(0.0, self._paused_until - time.monotonic()) * 1000, 1),
+                "throttled_responses": self._throttled,
+                "queue_depth": queue_depth,
+                "wait_times": wait_times
+            }
@@ -0,0 +1,184 @@
+import os
+import time
+import random
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Callable, Dict, Any, Optional
+from azure.core.exceptions import HttpResponseError, ServiceRequestError, ServiceResponseError
+
+
+class CircuitOpenError(Exception):
+    """依存サービスのサーキットブレーカーが開いている（呼び出しを即座に失敗させる）"""
+
+
+class DeadlineExceededError(Exception):
+    """リクエストの期限内に処理を完了できない"""
+
+
+# リクエスト単位の期限（time.monotonic() 基準）。contextvars で呼び出し先に伝搬する
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("deadline", default=None)
+
+
+@contextmanager
+def deadline_scope(seconds: Optional[float]):
+    """この範囲内の呼び出しに期限を設定（既存の期限より長くはしない）"""
+    if not seconds:
+        yield
+        return
+
+    deadline = time.monotonic() + seconds
+    current = _deadline.get()
+    token = _deadline.set(min(deadline, current) if current else deadline)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining_time() -> Optional[float]:
+    """期限までの残り秒数（期限なしは None）"""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def check_deadline(needed: float = 0.0):
+    """残り時間が needed 秒未満なら DeadlineExceededError"""
+    remaining = remaining_time()
+    if remaining is not None and remaining <= needed:
+        raise DeadlineExceededError("Request deadline exceeded")
+
+
+# 再試行すべき HTTP ステータス
+TRANSIENT_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+
+def is_transient_azure_error(error: Exception) -> bool:
+    """Azure SDK（Search / Blob）の一時的なエラー（接続エラー・タイムアウト・429・5xx）"""
+    if isinstance(error, (ServiceRequestError, ServiceResponseError)):
+        return True
+    return isinstance(error, HttpResponseError) and error.status_code in TRANSIENT_STATUS_CODES
+
+
+class CircuitBreaker:
+    """依存サービスごとのサーキットブレーカー
+
+    一時的な失敗が FAILURE_THRESHOLD 回続くと open になり、RESET_TIMEOUT 秒間は呼び出しを
+    即座に失敗させる。その後 half_open で1回だけ試行し、成功すれば closed に戻る。
+    """
+
+    FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+    RESET_TIMEOUT = float(os.getenv("CIRCUIT_RESET_TIMEOUT", "30"))
+
+    def __init__(self, name: str):
+        self.name = name
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        with self._lock:
+            if self.state == "open":
+                if time.monotonic() - self.opened_at < self.RESET_TIMEOUT:
+                    raise CircuitOpenError(f"{self.name} is unavailable (circuit open)")
+                self.state = "half_open"
+                self._trial_in_flight = False
+
+            if self.state == "half_open":
+                if self._trial_in_flight:
+                    raise CircuitOpenError(f"{self.name} is unavailable (circuit half-open)")
+                self._trial_in_flight = True
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.state == "half_open" or self.failures >= self.FAILURE_THRESHOLD:
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+    def release(self):
+        """一時的でない失敗（入力エラーなど）は健全性に影響させずに試行枠だけ返す"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"state": self.state, "failures": self.failures}
+
+
+class RetryPolicy:
+    """ジッター付き指数バックオフ（full jitter）"""
+
+    MAX_ATTEMPTS = int(os.getenv("RESILIENCE_MAX_ATTEMPTS", "3"))
+    BASE_DELAY = float(os.getenv("RESILIENCE_BASE_DELAY", "0.5"))
+    MAX_DELAY = float(os.getenv("RESILIENCE_MAX_DELAY", "8"))
+
+    def __init__(self, max_attempts: Optional[int] = None, base_delay: Optional[float] = None, max_delay: Optional[float] = None):
+        self.max_attempts = max_attempts or self.MAX_ATTEMPTS
+        self.base_delay = base_delay if base_delay is not None else self.BASE_DELAY
+        self.max_delay = max_delay if max_delay is not None else self.MAX_DELAY
+
+    def delay(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+_default_policy = RetryPolicy()
+
+
+def get_breaker(dependency: str) -> CircuitBreaker:
+    with _breakers_lock:
+        if dependency not in _breakers:
+            _breakers[dependency] = CircuitBreaker(dependency)
+        return _breakers[dependency]
+
+
+def breaker_status() -> Dict[str, Dict[str, Any]]:
+    """全依存サービスのサーキットブレーカーの状態"""
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {breaker.name: breaker.status() for breaker in breakers}
+
+
+def resilient_call(dependency: str, fn: Callable, *args, is_transient: Callable[[Exception], bool],
+                   policy: Optional[RetryPolicy] = None, **kwargs):
+    """依存サービスの呼び出しを、サーキットブレーカー・期限・再試行付きで実行
+
+    is_transient が True を返す例外だけを再試行・障害としてカウントする。
+    """
+    policy = policy or _default_policy
+    breaker = get_breaker(dependency)
+
+    for attempt in range(policy.max_attempts):
+        check_deadline()
+        breaker.before_call()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            if not is_transient(e):
+                breaker.release()
+                raise
+            breaker.record_failure()
+            if attempt + 1 >= policy.max_attempts:
+                raise
+
+            delay = policy.delay(attempt)
+            remaining = remaining_time()
+            if remaining is not None and remaining <= delay:
+                raise DeadlineExceededError(f"Request deadline exceeded while retrying {dependency}: {e}") from e
+            print(f"[Retry] {dependency}: attempt {attempt + 1} failed ({e}), retrying in {delay:.2f}s")
+            time.sleep(delay)
+            continue
+
+        breaker.record_success()
+        return result
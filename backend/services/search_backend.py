@@ -0,0 +1,60 @@
+from abc import ABC, abstractmethod
+from typing import List
+
+
+class SearchBackend(ABC):
+    """検索インデックスのインターフェース（Azure AI Search: SearchService / プロセス内: LocalSearchService）
+
+    ドキュメントはチャンク単位で、id・title・content・file_name・category・content_vector を持つ。
+    PERSISTENT が False のバックエンドはインデックスをプロセス内にしか持たないため、起動のたびに空になる。
+    """
+
+    PERSISTENT = True
+
+    @abstractmethod
+    def create_index(self) -> bool:
+        """インデックスを作成（既にあれば更新）"""
+
+    @abstractmethod
+    def index_document(self, doc_id: str, title: str, content: str, file_name: str, embedding: List[float], category: str = "") -> dict:
+        """1件のドキュメントを登録"""
+
+    @abstractmethod
+    def index_documents(self, docs: List[dict]) -> dict:
+        """複数のドキュメントをまとめて登録し、{"indexed": 件数, "indexed_ids", "failed": [{"id", "error"}], "batches"} を返す"""
+
+    @abstractmethod
+    def search(self, query: str, top: int = 5) -> List[dict]:
+        """全文検索"""
+
+    @abstractmethod
+    def vector_search(self, query_vector: List[float], top: int = 5) -> List[dict]:
+        """ベクトル検索"""
+
+    @abstractmethod
+    def hybrid_search(self, query: str, query_vector: List[float], top: int = 5, use_semantic: bool = False) -> List[dict]:
+        """全文検索とベクトル検索を組み合わせた検索"""
+
+    @abstractmethod
+    def delete_document(self, doc_id: str) -> bool:
+        """1件のドキュメントを削除"""
+
+    @abstractmethod
+    def delete_documents(self, doc_ids: List[str]) -> dict:
+        """複数のドキュメントを削除し、{"deleted": 件数, "failed": [{"id", "error"}]} を返す"""
+
+    @abstractmethod
+    def delete_by_file(self, file_name: str) -> dict:
+        """ファイルの全チャンクを削除（戻り値は delete_documents と同じ）"""
+
+    @abstractmethod
+    def delete_stale_chunks(self, file_name: str, keep_ids: List[str]) -> dict:
+        """ファイルのチャンクのうち keep_ids にないもの（前回の取り込みの残り）を削除"""
+
+    @abstractmethod
+    def clear_all(self) -> dict:
+        """全ドキュメントを削除"""
+
+    @abstractmethod
+    def stats(self) -> dict:
+        """メトリクス用の統計情報"""
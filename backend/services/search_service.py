@@ -1,4 +1,10 @@
 import os
+import json
+import time
+import array
+import hashlib
+import threading
+from datetime import datetime, timezone
 from azure.core.credentials import AzureKeyCredential
 from azure.search.documents import SearchClient
 from azure.search.documents.indexes import SearchIndexClient
@@ -18,8 +24,27 @@ from azure.search.documents.indexes.models import (
 )
 from typing import List, Optional
 
+from .search_backend import SearchBackend
+from .resilience import resilient_call, is_transient_azure_error
+from .ttl_cache import TTLCache
+
+
+class SearchService(SearchBackend):
+    # 一括登録の上限（Azure AI Search は1バッチ1000件・16MBまで。ベクトルが大きいので余裕を持たせる）
+    INDEX_BATCH_SIZE = int(os.getenv("AZURE_SEARCH_INDEX_BATCH_SIZE", "500"))
+    INDEX_BATCH_MAX_BYTES = int(os.getenv("AZURE_SEARCH_INDEX_BATCH_MAX_BYTES", str(8 * 1024 * 1024)))
+    # ファイル単位でチャンクIDを列挙する際の1ページの件数（Azure AI Search の top 上限は1000）
+    LIST_PAGE_SIZE = 1000
+    # $skip の上限（Azure AI Search の制限）と、ファイル単位の削除で一覧→削除を繰り返す最大回数
+    MAX_SKIP = 100000
+    MAX_DELETE_PASSES = int(os.getenv("AZURE_SEARCH_MAX_DELETE_PASSES", "20"))
+    # 検索結果のキャッシュ（インデックスを更新すると世代が変わり、それ以前の結果は使われなくなる）。
+    # 他のインスタンスからの更新は検知できないため、有効期限は短めにする
+    RESULT_CACHE_TTL = float(os.getenv("SEARCH_RESULT_CACHE_TTL", "300"))
+    RESULT_CACHE_MAX_BYTES = int(os.getenv("SEARCH_RESULT_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+    # 登録・削除が検索に反映されるまでの時間（この間の検索結果はキャッシュしない）
+    INDEX_SETTLE_SECONDS = float(os.getenv("SEARCH_INDEX_SETTLE_SECONDS", "2"))
 
-class SearchService:
     def __init__(self):
         endpoint = os.getenv("AZURE_SEARCH_ENDPOINT")
         api_key = os.getenv("AZURE_SEARCH_API_KEY")
@@ -27,19 +52,79 @@ class SearchService:
 
         if endpoint and api_key:
             credential = AzureKeyCredential(api_key)
+            # 再試行はレジリエンス層で行う（SDK の再試行と二重にしない）
             self.search_client = SearchClient(
                 endpoint=endpoint,
                 index_name=self.index_name,
-                credential=credential
+                credential=credential,
+                retry_total=0
             )
             self.index_client = SearchIndexClient(
                 endpoint=endpoint,
-                credential=credential
+                credential=credential,
+                retry_total=0
             )
         else:
             self.search_client = None
             self.index_client = None
 
+        if os.getenv("SEARCH_RESULT_CACHE_ENABLED", "true").lower() == "true":
+            self.result_cache = TTLCache(self.RESULT_CACHE_TTL, self.RESULT_CACHE_MAX_BYTES)
+        else:
+            self.result_cache = None
+        self._generation = 0
+        self._last_write = 0.0
+        self._generation_lock = threading.Lock()
+
+    def _bump_generation(self):
+        """インデックスを更新した（キャッシュ済みの検索結果を無効にする）"""
+        with self._generation_lock:
+            self._generation += 1
+            self._last_write = time.monotonic()
+
+    def _call(self, fn, *args, **kwargs):
+        """Azure AI Search の呼び出しを再試行・サーキットブレーカー付きで実行"""
+        return resilient_call("azure_search", fn, *args, is_transient=is_transient_azure_error, **kwargs)
+
+    def _search(self, **params) -> List[dict]:
+        """検索を実行して結果を確定させる（結果の取得は反復時に行われるため、再試行の範囲に含める）"""
+        return self._call(lambda: list(self.search_client.search(**params)))
+
+    def _cached_search(self, **params) -> List[dict]:
+        """検索結果をキャッシュから返す（キー: インデックスの世代 + 検索パラメータ）"""
+        if not self.result_cache:
+            return self._search(**params)
+
+        with self._generation_lock:
+            generation = self._generation
+            settling = time.monotonic() - self._last_write < self.INDEX_SETTLE_SECONDS
+        key = (generation, self._params_key(params))
+
+        results = self.result_cache.get(key)
+        if results is not None:
+            return results
+
+        results = self._search(**params)
+        if not settling:
+            size = len(json.dumps(results, ensure_ascii=False, default=str).encode("utf-8"))
+            self.result_cache.put(key, results, size)
+        return results
+
+    @staticmethod
+    def _params_key(params: dict) -> tuple:
+        """検索パラメータをキーにする（ベクトルはハッシュ値にする）"""
+        parts = []
+        for name, value in sorted(params.items()):
+            if name == "vector_queries":
+                value = tuple(
+                    (query.fields, query.k_nearest_neighbors, hashlib.sha256(array.array("d", query.vector).tobytes()).hexdigest())
+                    for query in value
+                )
+            elif isinstance(value, list):
+                value = tuple(value)
+            parts.append((name, value))
+        return tuple(parts)
+
     def create_index(self) -> bool:
         """Create or update the search index"""
         if not self.index_client:
@@ -93,7 +178,10 @@ class SearchService:
             semantic_search=semantic_search
         )
 
-        self.index_client.create_or_update_index(index)
+        try:
+            self._call(self.index_client.create_or_update_index, index)
+        finally:
+            self._bump_generation()
         return True
 
     def index_document(self, doc_id: str, title: str, content: str, file_name: str, embedding: List[float], category: str = "") -> dict:
@@ -101,9 +189,60 @@ class SearchService:
         if not self.search_client:
             raise Exception("Azure Search is not configured")
 
-        from datetime import datetime, timezone
+        document = self._build_document(doc_id, title, content, file_name, embedding, category)
+
+        try:
+            self._call(self.search_client.merge_or_upload_documents, [document])
+        finally:
+            self._bump_generation()
+        return {"indexed": True, "id": doc_id}
+
+    def index_documents(self, docs: List[dict]) -> dict:
+        """Index (merge or upload) many documents in size-bounded batches
+
+        docs の各要素は index_document と同じキー（doc_id, title, content, file_name, embedding, category）を持つ
+        """
+        if not self.search_client:
+            raise Exception("Azure Search is not configured")
+
+        documents = [
+            self._build_document(
+                doc["doc_id"], doc["title"], doc["content"], doc["file_name"],
+                doc["embedding"], doc.get("category", "")
+            )
+            for doc in docs
+        ]
+
+        indexed_ids = []
+        failed = []
+        batches = self._batch_documents(documents)
+
+        for batch in batches:
+            try:
+                results = self._call(self.search_client.merge_or_upload_documents, batch)
+            except Exception as e:
+                # バッチ全体が失敗した場合は全件をエラーとして報告
+                failed.extend({"id": doc["id"], "error": str(e)} for doc in batch)
+                continue
+            finally:
+                self._bump_generation()
+
+            for result in results:
+                if result.succeeded:
+                    indexed_ids.append(result.key)
+                else:
+                    failed.append({"id": result.key, "error": result.error_message or f"status {result.status_code}"})
+
+        return {
+            "indexed": len(indexed_ids),
+            "indexed_ids": indexed_ids,
+            "failed": failed,
+            "batches": len(batches)
+        }
 
-        document = {
+    def _build_document(self, doc_id: str, title: str, content: str, file_name: str, embedding: List[float], category: str = "") -> dict:
+        """インデックススキーマに合わせたドキュメントを作成"""
+        return {
             "id": doc_id,
             "title": title,
             "content": content,
@@ -113,15 +252,35 @@ class SearchService:
             "content_vector": embedding
         }
 
-        result = self.search_client.upload_documents([document])
-        return {"indexed": True, "id": doc_id}
+    def _batch_documents(self, documents: List[dict]) -> List[List[dict]]:
+        """件数とペイロードサイズの上限に収まるようにドキュメントをバッチ分割"""
+        batches: List[List[dict]] = []
+        current: List[dict] = []
+        current_bytes = 0
+
+        for document in documents:
+            size = len(json.dumps(document, ensure_ascii=False).encode("utf-8"))
+            if current and (
+                len(current) >= self.INDEX_BATCH_SIZE
+                or current_bytes + size > self.INDEX_BATCH_MAX_BYTES
+            ):
+                batches.append(current)
+                current = []
+                current_bytes = 0
+            current.append(document)
+            current_bytes += size
+
+        if current:
+            batches.append(current)
+
+        return batches
 
     def search(self, query: str, top: int = 5) -> List[dict]:
         """Full-text search"""
         if not self.search_client:
             raise Exception("Azure Search is not configured")
 
-        results = self.search_client.search(
+        results = self._cached_search(
             search_text=query,
             select=["id", "title", "content", "file_name", "upload_date", "category"],
             top=top
@@ -153,7 +312,7 @@ class SearchService:
             fields="content_vector"
         )
 
-        results = self.search_client.search(
+        results = self._cached_search(
             search_text=None,
             vector_queries=[vector_query],
             select=["id", "title", "content", "file_name", "upload_date", "category"],
@@ -199,7 +358,7 @@ class SearchService:
             search_params["query_type"] = "semantic"
             search_params["semantic_configuration_name"] = "test-all-ai"
 
-        results = self.search_client.search(**search_params)
+        results = self._cached_search(**search_params)
 
         return [
             {
@@ -220,9 +379,93 @@ class SearchService:
         if not self.search_client:
             raise Exception("Azure Search is not configured")
 
-        self.search_client.delete_documents([{"id": doc_id}])
+        try:
+            self._call(self.search_client.delete_documents, [{"id": doc_id}])
+        finally:
+            self._bump_generation()
         return True
 
+    def delete_documents(self, doc_ids: List[str]) -> dict:
+        """Delete many documents from the index in batches"""
+        if not self.search_client:
+            raise Exception("Azure Search is not configured")
+
+        deleted = 0
+        failed = []
+        for start in range(0, len(doc_ids), self.INDEX_BATCH_SIZE):
+            batch = doc_ids[start:start + self.INDEX_BATCH_SIZE]
+            try:
+                results = self._call(self.search_client.delete_documents, [{"id": doc_id} for doc_id in batch])
+            except Exception as e:
+                failed.extend({"id": doc_id, "error": str(e)} for doc_id in batch)
+                continue
+            finally:
+                self._bump_generation()
+
+            for result in results:
+                if result.succeeded:
+                    deleted += 1
+                else:
+                    failed.append({"id": result.key, "error": result.error_message or f"status {result.status_code}"})
+
+        return {"deleted": deleted, "failed": failed}
+
+    def delete_by_file(self, file_name: str) -> dict:
+        """Delete every chunk of a file, found through the filterable file_name field, in large batches"""
+        return self._delete_file_chunks(file_name, [])
+
+    def delete_stale_chunks(self, file_name: str, keep_ids: List[str]) -> dict:
+        """Delete the chunks of a file whose ids are not in keep_ids (left over from a previous ingest)"""
+        return self._delete_file_chunks(file_name, keep_ids)
+
+    def _delete_file_chunks(self, file_name: str, keep_ids: List[str]) -> dict:
+        """ファイルのチャンクのうち keep_ids 以外を削除
+
+        id はソート可能なフィールドではないため、"*" 検索の結果の順序は保証されず、
+        $skip によるページングでは読み飛ばしが起こりうる。そのため一覧→削除を先頭から取り直して繰り返し、
+        削除すべきIDが新たに見つからなくなったら終了する（削除済み・削除に失敗したIDは再度扱わない）
+        """
+        handled = set(keep_ids)
+        deleted = 0
+        failed = []
+        for _ in range(self.MAX_DELETE_PASSES):
+            doc_ids = [doc_id for doc_id in self._list_ids_by_file(file_name) if doc_id not in handled]
+            if not doc_ids:
+                break
+            handled.update(doc_ids)
+            result = self.delete_documents(doc_ids)
+            deleted += result["deleted"]
+            failed.extend(result["failed"])
+        return {"deleted": deleted, "failed": failed}
+
+    def _list_ids_by_file(self, file_name: str) -> List[str]:
+        """file_name フィールドで絞り込み、ファイルのチャンクIDをページングしながら取得
+
+        順序が保証されないため漏れ・重複がありうる（呼び出し側で取り直す）。$skip の上限を超える分は次回に回す
+        """
+        if not self.search_client:
+            raise Exception("Azure Search is not configured")
+
+        escaped = file_name.replace("'", "''")
+        doc_ids: dict = {}
+        skip = 0
+        while skip <= self.MAX_SKIP:
+            page = [
+                doc["id"]
+                for doc in self._search(
+                    search_text="*",
+                    filter=f"file_name eq '{escaped}'",
+                    select=["id"],
+                    top=self.LIST_PAGE_SIZE,
+                    skip=skip
+                )
+            ]
+            doc_ids.update(dict.fromkeys(page))
+            if len(page) < self.LIST_PAGE_SIZE:
+                break
+            skip += len(page)
+        return list(doc_ids)
+
     def clear_all(self) -> dict:
         """Clear all documents by deleting and recreating the index"""
         if not self.index_client:
@@ -230,10 +473,15 @@ class SearchService:
 
         try:
             # Delete the index
-            self.index_client.delete_index(self.index_name)
+            self._call(self.index_client.delete_index, self.index_name)
         except Exception:
             pass  # Index might not exist
+        self._bump_generation()
 
         # Recreate the index
         self.create_index()
         return {"cleared": True, "index_name": self.index_name}
+
+    def stats(self) -> dict:
+        """検索結果キャッシュの統計"""
+        return {"result_cache": self.result_cache.stats() if self.result_cache else None}
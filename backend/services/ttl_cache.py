@@ -0,0 +1,80 @@
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+
+class TTLCache:
+    """メモリ上の LRU キャッシュ（有効期限付き）
+
+    上限はエントリ数ではなく、呼び出し側が渡す推定サイズ（バイト）の合計で決める。
+    上限を超えた場合は最も長く使われていないエントリから追い出し、有効期限（ttl_seconds）を
+    過ぎたエントリは参照時に破棄する。
+    """
+
+    def __init__(self, ttl_seconds: float, max_bytes: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """キャッシュ済みの値（未キャッシュ・期限切れは None）"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+
+            value, size, expires_at = entry
+            if time.monotonic() >= expires_at:
+                del self._entries[key]
+                self._total_bytes -= size
+                self._stats["expirations"] += 1
+                self._stats["misses"] += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return value
+
+    def put(self, key: Hashable, value: Any, size: int):
+        """値を保存（size は推定バイト数。上限より大きい値は保存しない）"""
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._total_bytes -= previous[1]
+
+            self._entries[key] = (value, size, time.monotonic() + self.ttl_seconds)
+            self._total_bytes += size
+            while self._total_bytes > self.max_bytes:
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self._total_bytes -= evicted_size
+                self._stats["evictions"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """ヒット・ミス数と使用量を返す"""
+        with self._lock:
+            stats = dict(self._stats)
+            entries = len(self._entries)
+            total = self._total_bytes
+
+        lookups = stats["hits"] + stats["misses"]
+        stats.update({
+            "hit_rate": round(stats["hits"] / lookups, 3) if lookups else 0.0,
+            "entries": entries,
+            "total_bytes": total,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl_seconds
+        })
+        return stats
@@ -0,0 +1,112 @@
+"""テキストのチャンク分割の旧実装（TextExtractor._split_text_to_chunks の書き換え前のコピー）
+
+test_chunker_equivalence で、現在の実装が旧実装と同じチャンクを返すことの確認に使う。
+変更しないこと。チャンクは (text, chunk_id, chunk_type) のタプルで返す。
+"""
+import re
+from typing import List, Tuple
+
+MAX_CHUNK_SIZE = 200
+MIN_CHUNK_SIZE = 50
+OVERLAP_SIZE = 30
+
+
+def split_into_sentences(text: str) -> List[str]:
+    """テキストを文単位で分割"""
+    sentences = re.split(r'(?<=[。！？.!?])\s*', text)
+    return [s.strip() for s in sentences if s.strip()]
+
+
+def split_by_topic(text: str) -> List[str]:
+    """テキストをトピック（セクション/改行/見出し）単位で分割"""
+    heading_pattern = r'\n(?=(?:■|●|◆|▼|【|#|[0-9０-９]+[.．、)）]|\d+\.\s))'
+
+    sections = re.split(heading_pattern, text)
+
+    result = []
+    for section in sections:
+        section = section.strip()
+        if not section:
+            continue
+
+        if len(section) > MAX_CHUNK_SIZE:
+            paragraphs = section.split('\n\n')
+            for para in paragraphs:
+                para = para.strip()
+                if not para:
+                    continue
+                if len(para) > MAX_CHUNK_SIZE:
+                    lines = para.split('\n')
+                    for line in lines:
+                        line = line.strip()
+                        if line:
+                            result.append(line)
+                else:
+                    result.append(para)
+        else:
+            result.append(section)
+
+    return result
+
+
+def split_text_to_chunks(text: str, prefix: str = "") -> List[Tuple[str, str, str]]:
+    """テキストをトピック単位で分割"""
+    if len(text) <= MAX_CHUNK_SIZE:
+        header = f"[{prefix}]\n\n" if prefix else ""
+        return [(f"{header}{text}", "chunk_1", "text")]
+
+    chunks = []
+    chunk_num = 1
+
+    topics = split_by_topic(text)
+
+    current_chunk = ""
+    overlap_text = ""
+
+    for topic in topics:
+        if len(topic) > MAX_CHUNK_SIZE:
+            sentences = split_into_sentences(topic)
+
+            for sentence in sentences:
+                test_text = current_chunk + (" " if current_chunk else "") + sentence
+
+                if len(test_text) > MAX_CHUNK_SIZE and current_chunk:
+                    header = f"[{prefix} - {chunk_num}]\n\n" if prefix else ""
+                    full_text = overlap_text + current_chunk if overlap_text else current_chunk
+                    chunks.append((f"{header}{full_text}", f"chunk_{chunk_num}", "topic"))
+
+                    overlap_text = current_chunk[-OVERLAP_SIZE:] if len(current_chunk) > OVERLAP_SIZE else current_chunk
+                    overlap_text = "..." + overlap_text + " "
+
+                    chunk_num += 1
+                    current_chunk = sentence
+                else:
+                    current_chunk = test_text
+        else:
+            test_text = current_chunk + ("\n\n" if current_chunk else "") + topic
+
+            if len(test_text) > MAX_CHUNK_SIZE and current_chunk:
+                header = f"[{prefix} - {chunk_num}]\n\n" if prefix else ""
+                full_text = overlap_text + current_chunk if overlap_text else current_chunk
+                chunks.append((f"{header}{full_text}", f"chunk_{chunk_num}", "topic"))
+
+                overlap_text = current_chunk[-OVERLAP_SIZE:] if len(current_chunk) > OVERLAP_SIZE else current_chunk
+                overlap_text = "..." + overlap_text + " "
+
+                chunk_num += 1
+                current_chunk = topic
+            else:
+                current_chunk = test_text
+
+    if current_chunk and len(current_chunk) >= MIN_CHUNK_SIZE:
+        header = f"[{prefix} - {chunk_num}]\n\n" if prefix else ""
+        full_text = overlap_text + current_chunk if overlap_text else current_chunk
+        chunks.append((f"{header}{full_text}", f"chunk_{chunk_num}", "topic"))
+    elif current_chunk and chunks:
+        last_text, last_id, last_type = chunks[-1]
+        chunks[-1] = (last_text + "\n\n" + current_chunk, last_id, last_type)
+    elif current_chunk:
+        header = f"[{prefix}]\n\n" if prefix else ""
+        chunks.append((f"{header}{current_chunk}", "chunk_1", "topic"))
+
+    return chunks
@@ -0,0 +1,50 @@
+"""テキストのチャンク分割が旧実装（legacy_chunker）と同じ結果になることの確認
+
+実行方法（backend ディレクトリで）:
+    python -m unittest discover tests
+"""
+import glob
+import os
+import random
+import sys
+import unittest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+import legacy_chunker
+from services.extractor_service import TextExtractor
+
+TESTDATA_DIR = os.path.join(os.path.dirname(BACKEND_DIR), "testdata")
+
+# 見出し・空行・文末記号・長い文・全角文字など、分割の境界になりやすい断片
+FRAGMENTS = [
+    "■見出し\n", "● a\n", "これは文です。", "Short.", "長い文章が続きます！", "\n\n", "\n", "\n\n\n",
+    "1. 項目\n", "１、全角\n", "2) x", "3.5 ", "word " * 20, "？", " ", "\t", "。 ", "!!", "...",
+    "あ" * 250, "い" * 60, "【注意】", "#h\n", "\n#", "a.b", "x" * 199, "y" * 201, "\r\n", "　",
+]
+
+
+def _chunks(text, prefix=""):
+    return [(c.text, c.chunk_id, c.chunk_type) for c in TextExtractor._split_text_to_chunks(text, prefix)]
+
+
+class ChunkerEquivalenceTest(unittest.TestCase):
+    def test_random_texts(self):
+        rnd = random.Random(7)
+        for _ in range(3000):
+            text = "".join(rnd.choice(FRAGMENTS) for _ in range(rnd.randint(0, 80)))
+            for prefix in ("", "p"):
+                self.assertEqual(legacy_chunker.split_text_to_chunks(text, prefix), _chunks(text, prefix), repr(text))
+            self.assertEqual(legacy_chunker.split_into_sentences(text), TextExtractor._split_into_sentences(text))
+            self.assertEqual(legacy_chunker.split_by_topic(text), TextExtractor._split_by_topic(text))
+
+    def test_testdata_texts(self):
+        for path in glob.glob(os.path.join(TESTDATA_DIR, "*.txt")):
+            with open(path, encoding="utf-8") as f:
+                text = f.read()
+            self.assertEqual(legacy_chunker.split_text_to_chunks(text), _chunks(text), path)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,150 @@
+"""Word / PowerPoint の高速読み込み（OOXML_FAST_PATH）がライブラリ経由と同じチャンクを返すことの確認
+
+結合セル・入れ子の表・ハイパーリンク・変更履歴・改行・グループ・並べ替えたスライドなどを含む文書を
+ランダムに生成し、python-docx / python-pptx で読んだ場合と比べる。
+
+実行方法（backend ディレクトリで）:
+    python -m unittest discover tests
+"""
+import glob
+import importlib.util
+import io
+import os
+import random
+import sys
+import unittest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from services.extractor_service import TextExtractor
+
+TESTDATA_DIR = os.path.join(os.path.dirname(BACKEND_DIR), "testdata")
+HAS_DOCX = importlib.util.find_spec("docx") is not None
+HAS_PPTX = importlib.util.find_spec("pptx") is not None
+
+WORDS = ["テスト", "段落", "Hello", "world", "表", "セル", "データ", "  ", "。"]
+
+
+def _words(rnd, n):
+    return "".join(rnd.choice(WORDS) for _ in range(n))
+
+
+def _make_docx(rnd) -> bytes:
+    import docx
+    from docx.enum.text import WD_BREAK
+    from docx.oxml import OxmlElement
+
+    def inline_run(parent_tag, text):
+        parent = OxmlElement(parent_tag)
+        run = OxmlElement("w:r")
+        t = OxmlElement("w:t")
+        t.text = text
+        run.append(t)
+        parent.append(run)
+        return parent
+
+    document = docx.Document()
+    for i in range(rnd.randint(0, 40)):
+        paragraph = document.add_paragraph(_words(rnd, rnd.randint(0, 30)))
+        run = paragraph.add_run(_words(rnd, 3))
+        if rnd.random() < .3:
+            run.add_break()
+        if rnd.random() < .2:
+            run.add_tab()
+        if rnd.random() < .2:
+            run.add_break(WD_BREAK.PAGE)
+        if rnd.random() < .2:
+            paragraph._p.append(inline_run("w:hyperlink", _words(rnd, 2)))
+        if rnd.random() < .2:
+            paragraph._p.append(inline_run("w:ins", "INS"))
+        if rnd.random() < .2 and i % 5 == 0:
+            rows, cols = rnd.randint(1, 5), rnd.randint(1, 4)
+            table = document.add_table(rows=rows, cols=cols)
+            for row in table.rows:
+                for cell in row.cells:
+                    cell.text = _words(rnd, rnd.randint(0, 3))
+            if rows > 1 and rnd.random() < .5:
+                table.cell(0, 0).merge(table.cell(rows - 1, 0))
+            if cols > 2 and rnd.random() < .5:
+                table.cell(0, 1).merge(table.cell(0, cols - 1))
+            if rnd.random() < .3:
+                table.cell(0, 0).add_table(1, 1).cell(0, 0).text = "NESTED"
+
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+
+def _make_pptx(rnd) -> bytes:
+    from pptx import Presentation
+    from pptx.util import Inches
+
+    presentation = Presentation()
+    for _ in range(rnd.randint(0, 8)):
+        slide = presentation.slides.add_slide(presentation.slide_layouts[rnd.choice([0, 1, 5, 6])])
+        for placeholder in slide.placeholders:
+            if rnd.random() < .7:
+                text = _words(rnd, rnd.randint(0, 5))
+                if rnd.random() < .3:
+                    text += "\v" + _words(rnd, 2)
+                if rnd.random() < .5:
+                    text += "\n" + _words(rnd, 3)
+                placeholder.text = text
+        if rnd.random() < .5:
+            slide.shapes.add_textbox(0, 0, Inches(1), Inches(1)).text = _words(rnd, 4)
+        if rnd.random() < .3:
+            slide.shapes.add_group_shape().shapes.add_textbox(0, 0, 10, 10).text = "GROUP"
+        if rnd.random() < .3:
+            slide.shapes.add_table(2, 2, 0, 0, Inches(2), Inches(1)).table.cell(0, 0).text = "TABLE"
+
+    # スライドの表示順をファイル内の順序と変える
+    slide_ids = presentation.slides._sldIdLst
+    items = list(slide_ids)
+    rnd.shuffle(items)
+    for item in items:
+        slide_ids.remove(item)
+    for item in items:
+        slide_ids.append(item)
+
+    buffer = io.BytesIO()
+    presentation.save(buffer)
+    return buffer.getvalue()
+
+
+class OOXMLFastPathTest(unittest.TestCase):
+    def setUp(self):
+        self._fast_path = TextExtractor.OOXML_FAST_PATH
+
+    def tearDown(self):
+        TextExtractor.OOXML_FAST_PATH = self._fast_path
+
+    def _chunks(self, content, file_type, fast_path):
+        TextExtractor.OOXML_FAST_PATH = fast_path
+        return [(c.text, c.chunk_id, c.chunk_type) for c in TextExtractor._iter_chunks_from_source(content, "x", file_type)]
+
+    def _assert_same(self, content, file_type, message=None):
+        self.assertEqual(self._chunks(content, file_type, False), self._chunks(content, file_type, True), message)
+
+    @unittest.skipUnless(HAS_DOCX, "python-docx is not installed")
+    def test_random_docx(self):
+        rnd = random.Random(1)
+        for i in range(150):
+            self._assert_same(_make_docx(rnd), "Word", f"document {i}")
+
+    @unittest.skipUnless(HAS_PPTX, "python-pptx is not installed")
+    def test_random_pptx(self):
+        rnd = random.Random(2)
+        for i in range(150):
+            self._assert_same(_make_pptx(rnd), "PowerPoint", f"presentation {i}")
+
+    @unittest.skipUnless(HAS_DOCX and HAS_PPTX, "python-docx / python-pptx is not installed")
+    def test_testdata_files(self):
+        for path in glob.glob(os.path.join(TESTDATA_DIR, "*.docx")) + glob.glob(os.path.join(TESTDATA_DIR, "*.pptx")):
+            with open(path, "rb") as f:
+                content = f.read()
+            self._assert_same(content, "Word" if path.endswith(".docx") else "PowerPoint", path)
+
+
+if __name__ == "__main__":
+    unittest.main()